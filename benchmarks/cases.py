@@ -0,0 +1,244 @@
+# Benchmark cases
+#
+# Every case is a factory registered with @case. The factory does the
+# setup and returns a callable which the runner times; nothing here
+# touches the network.
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+from tvDatafeed import TvDatafeed, TvDatafeedLive, Seis, Consumer, Interval, Bar
+
+from . import payloads
+
+CASES = []
+
+
+def case(name, **params):
+    # register factory under name, once for every value combination
+    def decorator(factory):
+        keys = list(params)
+        combinations = [{}]
+        for key in keys:
+            combinations = [dict(c, **{key: value}) for c in combinations for value in params[key]]
+
+        for kwargs in combinations:
+            label = name + "".join(f"[{key}={kwargs[key]}]" for key in keys)
+            CASES.append((label, factory, kwargs))
+
+        return factory
+
+    return decorator
+
+
+def _tv():
+    return TvDatafeed()
+
+
+# parser
+
+@case("create_df", n_bars=(10, 1000, 5000))
+def create_df(n_bars):
+    raw_data = payloads.history(n_bars)
+    create = TvDatafeed._TvDatafeed__create_df
+    return lambda: create(raw_data, "BINANCE:BTCUSDT")
+
+
+@case("parse_bars", n_bars=(2, 10, 1000))
+def parse_bars(n_bars):
+    raw_data = payloads.history(n_bars)
+    return lambda: TvDatafeed._TvDatafeed__parse_bars(raw_data)
+
+
+# message framing and encoding
+
+@case("create_message")
+def create_message():
+    tv = _tv()
+    create = tv._TvDatafeed__create_message
+    args = [tv.chart_session, "s1", "s1", "symbol_1", "1", 5000]
+    return lambda: create("create_series", args)
+
+
+@case("filter_raw_message")
+def filter_raw_message():
+    tv = _tv()
+    text = tv._TvDatafeed__create_message("resolve_symbol", [
+        tv.chart_session, "symbol_1", '={"symbol":"BINANCE:BTCUSDT","adjustment":"splits","session":"regular"}'])
+    parse = TvDatafeed._TvDatafeed__filter_raw_message
+    return lambda: parse(text)
+
+
+# live scheduler registry
+
+_INTERVALS = list(Interval)
+
+
+def _seises(n):
+    return [Seis(f"SYM{i}", "BINANCE", _INTERVALS[i % len(_INTERVALS)]) for i in range(n)]
+
+
+def _sat(seises):
+    sat = TvDatafeedLive._SeisesAndTrigger()
+    for seis in seises:
+        sat.append(seis, datetime(2000, 1, 1))
+    return sat
+
+
+@case("sat_build", n=(10, 100, 1000, 10000))
+def sat_build(n):
+    seises = _seises(n)
+    return lambda: _sat(seises)
+
+
+@case("sat_get_seis", n=(10, 100, 1000, 10000))
+def sat_get_seis(n):
+    seises = _seises(n)
+    sat = _sat(seises)
+    last = seises[-1]
+    return lambda: sat.get_seis(last.symbol, last.exchange, last.interval)
+
+
+@case("sat_contains", n=(10, 100, 1000, 10000))
+def sat_contains(n):
+    seises = _seises(n)
+    sat = _sat(seises)
+    last = seises[-1]
+    return lambda: last in sat
+
+
+@case("sat_iterate", n=(10, 100, 1000, 10000))
+def sat_iterate(n):
+    sat = _sat(_seises(n))
+    return lambda: sum(1 for _ in sat)
+
+
+@case("sat_next_trigger", n=(10, 100, 1000, 10000))
+def sat_next_trigger(n):
+    sat = _sat(_seises(n))
+    return sat._next_trigger_dt
+
+
+@case("sat_get_expired", n=(10, 100, 1000, 10000))
+def sat_get_expired(n):
+    sat = _sat(_seises(n))
+    return sat.get_expired
+
+
+@case("sat_add_discard", n=(10, 100, 1000, 10000))
+def sat_add_discard(n):
+    sat = _sat(_seises(n))
+    extra = Seis("EXTRA", "BINANCE", Interval.in_1_minute)
+
+    def run():
+        sat.append(extra)
+        sat.discard(extra)
+
+    return run
+
+
+@case("sat_next_trigger_groups", groups=(10, 100, 1000))
+def sat_next_trigger_groups(groups):
+    # one interval group per Seis, custom intervals make groups plentiful
+    sat = _sat([Seis(f"SYM{i}", "BINANCE", Interval.custom(str(i + 2))) for i in range(groups)])
+    return sat._next_trigger_dt
+
+
+# live feed polling
+
+class _PublishingFeed(TvDatafeed):
+    # get_bars stand in which publishes a closed 1 minute bar delay
+    # seconds after close_bar() was called
+    delay = 0.0
+    bars = 1  # bars closed so far, the open one starts at bars * 60
+    closed_at = 0.0
+
+    def close_bar(self):
+        self.bars += 1
+        self.closed_at = time.monotonic()
+
+    def get_bars(self, symbol, exchange=None, interval=None, n_bars=10, fut_contract=None, extended_session=False):
+        shown = self.bars if time.monotonic() >= self.closed_at + self.delay else self.bars - 1
+        return [Bar((shown - 1) * 60, 1.0, 1.0, 1.0, 1.0, 1.0), Bar(shown * 60, 1.0, 1.0, 1.0, 1.0, 1.0)]
+
+
+class _PublishingLive(TvDatafeedLive, _PublishingFeed):
+    # live feed polling _PublishingFeed, the main loop is not started
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+
+@case("live_poll_lag", delay=(0.02, 0.05))
+def live_poll_lag(delay):
+    # one poll cycle of a Seis whose bars are published delay seconds
+    # after the close; the lag planner has to learn the delay first
+    feed = _PublishingLive(delay)
+    seis = Seis("BTCUSDT", "BINANCE", Interval.in_1_minute)
+
+    def run():
+        feed.close_bar()
+        expected = (feed.bars - 1) * 60
+        bar = feed._poll_seis(seis, closed_at=feed.closed_at, newer_than=expected - 60, expected=expected)
+        assert bar is not None and bar.time == expected
+
+    for _ in range(20):
+        run()
+    learned = feed.lag_planner.quantile(seis.exchange, seis.interval, feed.lag_planner.percentile)
+    if learned is None or not delay <= learned <= delay + 0.1:
+        raise AssertionError(f"learned publish lag {learned} does not follow the delay of {delay}s")
+
+    return run
+
+
+# consumer fan-out
+
+@case("consumer_fanout", consumers=(1, 10, 100), bars=(100,))
+def consumer_fanout(consumers, bars):
+    seis = Seis("BTCUSDT", "BINANCE", Interval.in_1_minute)
+    data = object()
+
+    def run():
+        done = threading.Barrier(consumers + 1)
+        remaining = [bars] * consumers
+
+        group = []
+        for i in range(consumers):
+            def on_bar(seis, data, i=i):
+                remaining[i] -= 1
+                if remaining[i] == 0:
+                    done.wait()
+            consumer = Consumer(seis, on_bar)
+            consumer.start()
+            group.append(consumer)
+
+        for _ in range(bars):
+            for consumer in group:
+                consumer.put(data)
+
+        done.wait()
+        for consumer in group:
+            consumer.stop()
+        for consumer in group:
+            consumer.join()
+
+    return run
+
+
+# import time, each run is a fresh interpreter so interpreter start up
+# is included; import_baseline gives the start up cost alone
+
+_IMPORTS = {
+    "baseline": "pass",
+    "package": "import tvDatafeed",
+    "classes": "from tvDatafeed import TvDatafeed, TvDatafeedLive, Seis, Consumer, Interval",
+    "with_pandas": "from tvDatafeed import TvDatafeed; import pandas",
+}
+
+
+@case("import", variant=tuple(_IMPORTS))
+def import_time(variant):
+    command = [sys.executable, "-c", _IMPORTS[variant]]
+    return lambda: subprocess.run(command, check=True)
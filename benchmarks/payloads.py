@@ -0,0 +1,45 @@
+# Synthetic TradingView websocket payloads for offline benchmarks
+#
+# Messages follow the layout of what the server sends during a
+# get_hist request so that the parsing code paths are exercised
+# exactly as they are against live data.
+import json
+import random
+
+
+def frame(message):
+    # wrap message into ~m~<length>~m~ frame
+    text = json.dumps(message, separators=(",", ":"))
+    return "~m~" + str(len(text)) + "~m~" + text
+
+
+def bars(n_bars, start=1700000000, step=60, seed=0):
+    # list of [timestamp, open, high, low, close, volume] random walk bars
+    rnd = random.Random(seed)
+    price = 100.0
+    rows = []
+    for i in range(n_bars):
+        open_ = price
+        close = max(0.01, open_ + rnd.uniform(-1, 1))
+        high = max(open_, close) + rnd.uniform(0, 0.5)
+        low = min(open_, close) - rnd.uniform(0, 0.5)
+        rows.append([float(start + i * step), round(open_, 2), round(high, 2),
+                     round(low, 2), round(close, 2), float(rnd.randint(100, 100000))])
+        price = close
+
+    return rows
+
+
+def history(n_bars, symbol="BINANCE:BTCUSDT", chart_session="cs_benchmarkxxxx", step=60):
+    # raw_data string as accumulated by get_hist for a n_bars request
+    messages = [
+        {"m": "symbol_resolved", "p": [chart_session, "symbol_1", {
+            "name": symbol.split(":")[-1], "exchange": symbol.split(":")[0], "timezone": "Etc/UTC",
+            "session": "24x7", "pricescale": 100, "minmov": 1, "type": "crypto"}]},
+        {"m": "timescale_update", "p": [chart_session, {"s1": {
+            "node": "bench", "s": [{"i": i, "v": v} for i, v in enumerate(bars(n_bars, step=step))],
+            "ns": {"d": "", "indexes": []}, "t": "s_1", "lbs": {"bar_close_time": 1700000060}}}]},
+        {"m": "series_completed", "p": [chart_session, "s1", "streaming", "s_1"]},
+    ]
+
+    return "\n".join(frame(message) for message in messages) + "\n"
@@ -0,0 +1,109 @@
+# Offline benchmark runner
+#
+# Usage (from repository root):
+#   python -m benchmarks.run -o results.json
+#   python -m benchmarks.run -o new.json --compare results.json
+#   python -m benchmarks.run -k sat_
+#
+# Each case is timed with timeit autorange, best and median of the
+# repeats are reported per call. Peak memory of a single call is
+# measured separately with tracemalloc so tracing does not distort
+# the timings. Comparing against a previous results file flags every
+# case which got slower than the threshold and exits with status 1.
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+
+import tvDatafeed
+
+from .cases import CASES
+
+
+def measure(fn, repeat):
+    fn()  # warm up
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    samples = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "best_s": min(samples),
+        "median_s": statistics.median(samples),
+        "number": number,
+        "repeat": repeat,
+        "peak_bytes": peak,
+    }
+
+
+def compare(results, baseline, threshold):
+    # print ratio of new/old best time, return names of regressed cases
+    regressed = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        ratio = result["best_s"] / old["best_s"]
+        mem_ratio = result["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- slower"
+            regressed.append(name)
+        print(f"{name:<50} time x{ratio:6.2f}  memory x{mem_ratio:6.2f}{flag}")
+
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("-o", "--output", help="write results to JSON file")
+    parser.add_argument("-k", "--filter", default="", help="run only cases whose name contains this text")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="timing repeats per case (default: 5)")
+    parser.add_argument("--compare", metavar="JSON", help="compare against previous results file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported as regression (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)  # nologin warnings of benchmark instances
+
+    results = {}
+    for name, factory, kwargs in CASES:
+        if args.filter not in name:
+            continue
+        results[name] = result = measure(factory(**kwargs), args.repeat)
+        print(f"{name:<50} {result['best_s'] * 1e6:12.2f} us  {result['peak_bytes'] / 1024:10.1f} KiB", flush=True)
+
+    report = {
+        "meta": {
+            "tvdatafeed": tvDatafeed.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)["results"]
+        print()
+        if compare(results, baseline, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
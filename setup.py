@@ -25,6 +25,10 @@ setup(
         "setuptools",
         "pandas",
         "websocket-client",
-        "requests"
+        "requests",
+        "tzdata",
     ],
+    extras_require={
+        "parquet": ["pyarrow"],
+    },
 )
@@ -1,6 +1,32 @@
-from .main import TvDatafeed, Interval
-from .seis import Seis
-from .datafeed import TvDatafeedLive
-from .consumer import Consumer
+import importlib
 
 __version__ = "2.1.0"
+
+# public classes are imported on first access, this keeps "import
+# tvDatafeed" cheap for short lived processes. Heavy dependencies
+# (pandas, requests, websocket-client) are only loaded when first used.
+_exports = {
+    "TvDatafeed": ".main",
+    "Interval": ".interval",
+    "Seis": ".seis",
+    "TvDatafeedLive": ".datafeed",
+    "Consumer": ".consumer",
+    "QuoteStream": ".stream",
+    "Bar": ".bar",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
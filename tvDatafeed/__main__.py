@@ -0,0 +1,65 @@
+import argparse
+import logging
+import os
+import sys
+
+
+def _download(args):
+    from .main import TvDatafeed
+    from .download import BulkDownloader, read_universe
+    from .ratelimit import RateLimiter
+
+    jobs = read_universe(args.universe, n_bars=args.n_bars)
+    limiter = RateLimiter(path=args.shared_limits) if args.shared_limits else None
+    tv = TvDatafeed(args.username, args.password, rate_limiter=limiter)
+    downloader = BulkDownloader(
+        tv,
+        args.out_dir,
+        concurrency=args.concurrency,
+        resume=not args.no_resume,
+        extended_session=args.extended_session,
+        progress_every=args.progress_every,
+    )
+    stats = downloader.run(jobs)
+
+    return 1 if stats["failed"] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tvDatafeed")
+    parser.add_argument("-v", "--verbose", action="store_true", help="enable debug logging")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    download = commands.add_parser(
+        "download",
+        help="bulk download historical data into partitioned Parquet",
+        description="Download every symbol listed in a universe CSV file (columns: "
+        "symbol, exchange, interval and optionally n_bars) into "
+        "OUT_DIR/interval=<interval>/exchange=<exchange>/<symbol>.parquet. "
+        "Interrupted runs resume from the checkpoint manifest in OUT_DIR.",
+    )
+    download.add_argument("universe", help="universe CSV file")
+    download.add_argument("-o", "--out-dir", default="data", help="output directory (default: data)")
+    download.add_argument("-c", "--concurrency", type=int, default=4, help="parallel connections (default: 4)")
+    download.add_argument("-n", "--n-bars", type=int, default=5000,
+                          help="bars per symbol when the universe has no n_bars column (default: 5000)")
+    download.add_argument("--extended-session", action="store_true", help="download extended session data")
+    download.add_argument("--no-resume", action="store_true", help="ignore the checkpoint manifest")
+    download.add_argument("--progress-every", type=float, default=10,
+                          help="seconds between progress reports, 0 disables (default: 10)")
+    download.add_argument("--shared-limits", metavar="DIR",
+                          help="share request rate limits with other processes through files in DIR")
+    download.add_argument("--username", default=os.environ.get("TV_USERNAME"),
+                          help="TradingView username (default: $TV_USERNAME)")
+    download.add_argument("--password", default=os.environ.get("TV_PASSWORD"),
+                          help="TradingView password (default: $TV_PASSWORD)")
+    download.set_defaults(func=_download)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import collections
+import datetime
+
+
+class Bar(collections.namedtuple("Bar", ("time", "open", "high", "low", "close", "volume"))):
+    """
+    One immutable OHLCV bar
+
+    Passed to live feed consumers in place of a one-row DataFrame. A
+    single instance is shared by all consumers of a Seis, being a tuple
+    it can not be changed by any of them.
+
+    Attributes
+    ----------
+    time : int
+        epoch timestamp of the bar start
+    open : float
+    high : float
+    low : float
+    close : float
+    volume : float
+        0.0 if the symbol has no volume data
+    """
+
+    __slots__ = ()
+
+    @property
+    def datetime(self):
+        # bar start as naive local datetime, as in get_hist DataFrames
+        return datetime.datetime.fromtimestamp(self.time)
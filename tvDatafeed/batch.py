@@ -0,0 +1,143 @@
+import functools
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from .interval import Interval
+
+logger = logging.getLogger(__name__)
+
+# per worker process state, set up by _init_worker
+_worker_tv = None
+_worker_pool = None
+_worker_extended_session = False
+
+
+@functools.lru_cache(maxsize=None)
+def _pyarrow():
+    # pyarrow imported on first use, None if not installed
+    try:
+        import pyarrow
+    except ImportError:
+        return None
+
+    return pyarrow
+
+
+def _to_ipc(data):
+    # serialize DataFrame column by column; Arrow IPC stream when
+    # pyarrow is installed, pickle of the DataFrame blocks otherwise
+    if data is None:
+        return None
+
+    pa = _pyarrow()
+    if pa is not None:
+        table = pa.Table.from_pandas(data)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    return pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _from_ipc(payload):
+    if payload is None:
+        return None
+
+    pa = _pyarrow()
+    if pa is not None:
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+    return pickle.loads(payload)
+
+
+def _init_worker(username, password, connections, extended_session, rate_limit_dir):
+    # runs once in every worker process: sign in and create the thread
+    # pool which holds this worker's connections
+    global _worker_tv, _worker_pool, _worker_extended_session
+    from .main import TvDatafeed
+    from .ratelimit import RateLimiter
+
+    _worker_tv = TvDatafeed(username, password, rate_limiter=RateLimiter(path=rate_limit_dir))
+    _worker_pool = ThreadPoolExecutor(max_workers=connections)
+    _worker_extended_session = extended_session
+
+
+def _fetch_one(request):
+    symbol, exchange, interval, n_bars = request
+    try:
+        data = _worker_tv.get_hist(
+            symbol, exchange, interval=interval, n_bars=n_bars, extended_session=_worker_extended_session
+        )
+    except Exception as e:
+        logger.error(f"failed to get {exchange}:{symbol}: {e}")
+        data = None
+
+    return _to_ipc(data)
+
+
+def _fetch_chunk(requests):
+    # fetch and parse a chunk of requests over this worker's connections
+    return list(_worker_pool.map(_fetch_one, requests))
+
+
+def get_hist_batch(
+    requests,
+    username: str = None,
+    password: str = None,
+    workers: int = None,
+    connections: int = 4,
+    extended_session: bool = False,
+    rate_limit_dir: str = None,
+):
+    """get historical data for many symbols using a pool of worker processes
+
+    Fetching and DataFrame construction happen in the worker processes,
+    each signed in separately and fetching over its own connections.
+    Results are sent back to the parent as Arrow IPC streams (pickled
+    DataFrame blocks when pyarrow is not installed), never row by row.
+
+    Args:
+        requests (list): (symbol, exchange, interval, n_bars) tuples, interval may be an Interval or resolution string
+        username (str, optional): tradingview username. Defaults to None.
+        password (str, optional): tradingview password. Defaults to None.
+        workers (int, optional): number of worker processes. Defaults to os.cpu_count().
+        connections (int, optional): concurrent connections per worker. Defaults to 4.
+        extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+        rate_limit_dir (str, optional): directory of the rate limiter shared by all workers. Defaults to a temporary directory.
+
+    Returns:
+        list: DataFrame for every request in the same order, None where no data was received
+    """
+    requests = [
+        (symbol, exchange, Interval.custom(interval), n_bars)
+        for symbol, exchange, interval, n_bars in requests
+    ]
+    if not requests:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, min(connections * 4, len(requests) // workers))
+    chunks = [requests[i:i + chunk_size] for i in range(0, len(requests), chunk_size)]
+
+    tmp_dir = None
+    if rate_limit_dir is None:  # all workers still share one request budget
+        rate_limit_dir = tmp_dir = tempfile.mkdtemp(prefix="tvdatafeed_")
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(username, password, connections, extended_session, rate_limit_dir),
+        ) as pool:
+            results = []
+            for payloads in pool.map(_fetch_chunk, chunks):
+                results.extend(_from_ipc(payload) for payload in payloads)
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return results
@@ -1,6 +1,128 @@
-import threading, queue, traceback
+import threading, traceback, collections, logging
+from tvDatafeed import tracing
 
-class Consumer(threading.Thread):
+logger = logging.getLogger(__name__)
+
+POLICIES=("block", "drop_oldest", "drop_newest", "latest")
+
+class ConsumerQueue(object):
+    '''
+    Buffer of data waiting to be passed to a consumer callback
+    
+    Without capacity the buffer is unbounded. When capacity bars are 
+    waiting the policy decides what happens with the next one: 
+    "block" makes the producer wait for space, "drop_oldest" discards 
+    the oldest waiting bar and "drop_newest" the new one. With 
+    "latest" only the newest bar is kept whatever the capacity. The 
+    None stop signal is never dropped and never waits, data put after
+    it is ignored.
+    
+    Parameters
+    ----------
+    capacity : int, optional
+        maximum number of waiting bars, default is no limit
+    policy : str, optional
+        "block", "drop_oldest", "drop_newest" or "latest" (default
+        "block")
+    
+    Attributes
+    ----------
+    dropped : int
+        number of bars discarded by the policy
+    high_water : int
+        largest number of bars that were waiting at the same time
+    '''
+    def __init__(self, capacity=None, policy="block"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {', '.join(POLICIES)}")
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        
+        self.capacity=capacity
+        self.policy=policy
+        self.dropped=0
+        self.high_water=0
+        self._items=collections.deque()
+        self._cond=threading.Condition(threading.Lock())
+        self._stopping=False # stop signal has been put
+        self._closed=False
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def put(self, data):
+        # add data, False if it was not accepted because the consumer
+        # is stopping or closed
+        with self._cond:
+            if self._stopping or self._closed:
+                return False
+            
+            if data is None:
+                self._stopping=True
+            elif self.policy == "latest":
+                self.dropped+=len(self._items)
+                self._items.clear()
+            elif self.capacity is not None and len(self._items) >= self.capacity:
+                if self.policy == "drop_newest":
+                    self.dropped+=1
+                    return True
+                if self.policy == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped+=1
+                else: # block until the consumer has made space
+                    while len(self._items) >= self.capacity and not self._closed:
+                        self._cond.wait()
+                    if self._closed or self._stopping:
+                        return False
+            
+            self._items.append(data)
+            if data is not None and len(self._items) > self.high_water:
+                self.high_water=len(self._items)
+            self._cond.notify_all()
+            return True
+    
+    def get(self):
+        # remove and return the oldest data, wait until there is some
+        with self._cond:
+            while not self._items:
+                self._cond.wait()
+            data=self._items.popleft()
+            self._cond.notify_all() # blocked producers
+            return data
+    
+    def pop(self):
+        # remove and return the oldest data, raise IndexError if empty
+        with self._cond:
+            data=self._items.popleft()
+            self._cond.notify_all()
+            return data
+    
+    def close(self):
+        # discard waiting data and refuse new data
+        with self._cond:
+            self._closed=True
+            self._items.clear()
+            self._cond.notify_all()
+
+class _QueueStats(object):
+    # queue statistics of consumers with a ConsumerQueue in _buffer
+    
+    @property
+    def depth(self):
+        # number of bars waiting for the callback
+        return len(self._buffer)
+    
+    @property
+    def dropped(self):
+        # number of bars discarded by the queue policy
+        return self._buffer.dropped
+    
+    @property
+    def high_water(self):
+        # largest number of bars that were waiting at the same time
+        return self._buffer.high_water
+
+class Consumer(_QueueStats, threading.Thread):
     '''
     Seis data consumer and processor
     
@@ -16,7 +138,26 @@ class Consumer(threading.Thread):
         Consumer receives data bar from this Seis
     callback : func
         reference to a function to be called when new data available,
-        function protoype must be func_name(seis, data)
+        function protoype must be func_name(seis, data) where data is a
+        Bar, or a DataFrame if as_frame is set
+    capacity : int, optional
+        maximum number of bars waiting for the callback, default is
+        no limit
+    policy : str, optional
+        what to do with a new bar when capacity bars are waiting, see
+        ConsumerQueue (default "block")
+    as_frame : bool, optional
+        pass bars as one-row DataFrames in get_hist format instead of
+        Bar tuples (default False)
+    
+    Attributes
+    ----------
+    depth : int
+        number of bars waiting for the callback
+    dropped : int
+        number of bars discarded by the queue policy
+    high_water : int
+        largest number of bars that were waiting at the same time
     
     Methods
     -------
@@ -29,10 +170,11 @@ class Consumer(threading.Thread):
     stop()
         Stop the data processing and callback thread
     '''
-    def __init__(self, seis, callback):
+    def __init__(self, seis, callback, capacity=None, policy="block", as_frame=False):
         super().__init__()
 
-        self._buffer=queue.Queue()               
+        self._buffer=ConsumerQueue(capacity, policy)
+        self.as_frame=as_frame
         self.seis=seis
         self.callback=callback
         self.name=self.callback.__name__+"_"+self.seis.symbol+"_"+seis.exchange+"_"+seis.interval.value
@@ -51,17 +193,18 @@ class Consumer(threading.Thread):
                 break
 
             try: # in case user provided function throws an exception
-                self.callback(self.seis, data)
+                with tracing.span("tvdatafeed.consumer.callback", callback=self.callback.__name__, **tracing.seis_attributes(self.seis)):
+                    self.callback(self.seis, data)
             except Exception as e: # remove the consumer from Seis and close down gracefully
                 self.del_consumer()
                 self.seis=None # delete references
                 self.callback=None
-                self._buffer=None
+                self._buffer.close()
                 raise e from None
         
         self.seis=None # delete references
         self.callback=None
-        self._buffer=None
+        self._buffer.close()
     
     def put(self, data):
         '''
@@ -69,10 +212,10 @@ class Consumer(threading.Thread):
         
         Parameters
         ----------
-        data : pandas.DataFrame
+        data : Bar or pandas.DataFrame
             contains single bar data retrieved from TradingView
         '''
-        self._buffer.put(data)
+        self._buffer.put(data) # ignored once the thread has closed down
     
     def del_consumer(self, timeout=-1):
         '''
@@ -91,9 +234,488 @@ class Consumer(threading.Thread):
         '''
         return self.seis.del_consumer(self, timeout)
     
+    def stop(self):
+        '''
+        Stop the data processing and callback thread
+        '''
+        self.put(None)
+        
+
+class PooledConsumer(_QueueStats):
+    '''
+    Seis data consumer processed on a shared worker pool
+    
+    Works like Consumer but has no thread of its own, the callback is
+    run by a worker of the executor. Bars of one consumer are passed 
+    to its callback one at a time and in the order they were put, 
+    different consumers are processed in parallel on up to as many 
+    workers as the executor has.
+    
+    Parameters
+    ----------
+    seis : Seis
+        Consumer receives data bar from this Seis
+    callback : func
+        reference to a function to be called when new data available,
+        function protoype must be func_name(seis, data) where data is a
+        Bar, or a DataFrame if as_frame is set
+    executor : concurrent.futures.Executor
+        runs the callbacks, shared by many consumers
+    capacity : int, optional
+        maximum number of bars waiting for the callback, default is
+        no limit
+    policy : str, optional
+        what to do with a new bar when capacity bars are waiting, see
+        ConsumerQueue (default "block")
+    as_frame : bool, optional
+        pass bars as one-row DataFrames in get_hist format instead of
+        Bar tuples (default False)
+    
+    Attributes
+    ----------
+    depth : int
+        number of bars waiting for the callback
+    dropped : int
+        number of bars discarded by the queue policy
+    high_water : int
+        largest number of bars that were waiting at the same time
+    
+    Methods
+    -------
+    put(data)
+        Put new data into buffer to be processed
+    del_consumer()
+        Stop processing and remove from Seis
+    start()
+        no-op, kept for compatibility with Consumer
+    stop()
+        Stop processing once the buffered data is done
+    join(timeout)
+        Wait until processing has stopped
+    is_alive()
+        True until processing has stopped
+    '''
+    BATCH=16 # bars processed in one turn on a worker before other consumers get a turn
+    
+    def __init__(self, seis, callback, executor, capacity=None, policy="block", as_frame=False):
+        self._buffer=ConsumerQueue(capacity, policy)
+        self.as_frame=as_frame
+        self._lock=threading.Lock()
+        self._scheduled=False # a worker turn is submitted or running
+        self._closed=threading.Event()
+        self._executor=executor
+        self.seis=seis
+        self.callback=callback
+        self.name=self.callback.__name__+"_"+self.seis.symbol+"_"+seis.exchange+"_"+seis.interval.value
+    
+    def __repr__(self):
+        return f'PooledConsumer({repr(self.seis)},{self.callback.__name__})'
+    
+    def __str__(self):
+        return f'{repr(self.seis)},callback={self.callback.__name__}'
+    
+    def start(self):
+        '''
+        No-op, processing starts with the first put
+        '''
+    
+    def put(self, data):
+        '''
+        Put new data into buffer to be processed
+        
+        Parameters
+        ----------
+        data : Bar or pandas.DataFrame
+            contains single bar data retrieved from TradingView
+        '''
+        if not self._buffer.put(data): # stopping or processing has stopped
+            return
+        
+        with self._lock: # checked after putting, a finishing turn clears it under the lock
+            if self._scheduled:
+                return
+            self._scheduled=True
+        
+        self._submit()
+    
+    def _submit(self):
+        try:
+            self._executor.submit(self._run)
+        except RuntimeError: # executor shut down
+            self._close()
+    
+    def _run(self):
+        # one turn on a worker, processes up to BATCH bars
+        for _ in range(self.BATCH):
+            with self._lock:
+                try:
+                    data=self._buffer.pop()
+                except IndexError:
+                    self._scheduled=False
+                    return
+            
+            if data is None:
+                self._close()
+                return
+            
+            try: # in case user provided function throws an exception
+                with tracing.span("tvdatafeed.consumer.callback", callback=self.callback.__name__, **tracing.seis_attributes(self.seis)):
+                    self.callback(self.seis, data)
+            except Exception: # remove the consumer from Seis and close down gracefully
+                logger.exception(f"callback of {self!r} failed, consumer removed")
+                self.del_consumer()
+                self._close()
+                return
+        
+        self._submit() # more bars may be waiting, continue in a new turn
+    
+    def _close(self):
+        self._buffer.close()
+        with self._lock:
+            self._scheduled=False
+        self.seis=None # delete references
+        self.callback=None
+        self._closed.set()
+    
+    def del_consumer(self, timeout=-1):
+        '''
+        Stop processing and remove from Seis
+        
+        Parameters
+        ----------
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        
+        Returns
+        -------
+        boolean
+            True if successful, False if timed out.
+        '''
+        return self.seis.del_consumer(self, timeout)
+    
+    def stop(self):
+        '''
+        Stop processing once the buffered data is done
+        '''
+        self.put(None)
+    
+    def join(self, timeout=None):
+        '''
+        Wait until processing has stopped
+        
+        Parameters
+        ----------
+        timeout : float, optional
+            maximum time to wait in seconds, default is no limit
+        '''
+        self._closed.wait(timeout)
+    
+    def is_alive(self):
+        return not self._closed.is_set()
+
+
+class AsyncConsumer(_QueueStats):
+    '''
+    Seis data consumer with a coroutine function callback
+    
+    Every bar is passed to the callback in a task on the event loop,
+    no thread is used. Up to concurrency tasks of this consumer run at
+    the same time, with the default of 1 bars are processed one at a
+    time in the order they were put.
+    
+    Parameters
+    ----------
+    seis : Seis
+        Consumer receives data bar from this Seis
+    callback : coroutine function
+        called when new data available, function protoype must be 
+        async def func_name(seis, data) where data is a Bar, or a 
+        DataFrame if as_frame is set
+    loop : asyncio.AbstractEventLoop
+        event loop the tasks are run on
+    concurrency : int, optional
+        maximum number of tasks running at the same time, None for no
+        limit (default 1)
+    capacity : int, optional
+        maximum number of bars waiting for a task, default is no limit
+    policy : str, optional
+        what to do with a new bar when capacity bars are waiting, see
+        ConsumerQueue (default "block")
+    as_frame : bool, optional
+        pass bars as one-row DataFrames in get_hist format instead of
+        Bar tuples (default False)
+    
+    Attributes
+    ----------
+    depth : int
+        number of bars waiting for a task
+    dropped : int
+        number of bars discarded by the queue policy
+    high_water : int
+        largest number of bars that were waiting at the same time
+    
+    Methods
+    -------
+    put(data)
+        Put new data into buffer to be processed
+    del_consumer()
+        Stop processing and remove from Seis
+    start()
+        no-op, kept for compatibility with Consumer
+    stop()
+        Stop processing once the buffered data is done
+    join(timeout)
+        Wait until processing has stopped, not from the event loop
+    is_alive()
+        True until processing has stopped
+    '''
+    def __init__(self, seis, callback, loop, concurrency=1, capacity=None, policy="block", as_frame=False):
+        if concurrency is not None and concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        
+        self._buffer=ConsumerQueue(capacity, policy)
+        self.as_frame=as_frame
+        self._loop=loop
+        self._concurrency=concurrency
+        self._tasks=set() # running tasks, only used on the loop
+        self._stopping=False
+        self._closed=threading.Event()
+        self.seis=seis
+        self.callback=callback
+        self.name=self.callback.__name__+"_"+self.seis.symbol+"_"+seis.exchange+"_"+seis.interval.value
+    
+    def __repr__(self):
+        return f'AsyncConsumer({repr(self.seis)},{self.callback.__name__})'
+    
+    def __str__(self):
+        return f'{repr(self.seis)},callback={self.callback.__name__}'
+    
+    def start(self):
+        '''
+        No-op, processing starts with the first put
+        '''
+    
+    def put(self, data):
+        '''
+        Put new data into buffer to be processed, safe to call from
+        any thread
+        
+        Parameters
+        ----------
+        data : Bar or pandas.DataFrame
+            contains single bar data retrieved from TradingView
+        '''
+        if not self._buffer.put(data): # stopping or processing has stopped
+            return
+        
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch)
+        except RuntimeError: # event loop closed
+            self._close()
+    
+    def _dispatch(self):
+        # on the loop: start tasks for waiting bars up to the limit
+        while not self._stopping and (self._concurrency is None or len(self._tasks) < self._concurrency):
+            try:
+                data=self._buffer.pop()
+            except IndexError:
+                return
+            
+            if data is None:
+                self._stopping=True
+                break
+            
+            task=self._loop.create_task(self._call(data))
+            self._tasks.add(task)
+            task.add_done_callback(self._done)
+        
+        if self._stopping and not self._tasks:
+            self._close()
+    
+    def _done(self, task):
+        self._tasks.discard(task)
+        self._dispatch()
+    
+    async def _call(self, data):
+        seis, callback = self.seis, self.callback
+        if callback is None: # closed after a failed callback
+            return
+        
+        try: # in case user provided function throws an exception
+            with tracing.span("tvdatafeed.consumer.callback", callback=callback.__name__, **tracing.seis_attributes(seis)):
+                await callback(seis, data)
+        except Exception: # remove the consumer from Seis and close down gracefully
+            logger.exception(f"callback of {self!r} failed, consumer removed")
+            self.del_consumer()
+            self._stopping=True
+    
+    def _close(self):
+        self._buffer.close()
+        self.seis=None # delete references
+        self.callback=None
+        self._closed.set()
+    
+    def del_consumer(self, timeout=-1):
+        '''
+        Stop processing and remove from Seis
+        
+        Parameters
+        ----------
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        
+        Returns
+        -------
+        boolean
+            True if successful, False if timed out.
+        '''
+        return self.seis.del_consumer(self, timeout)
+    
+    def stop(self):
+        '''
+        Stop processing once the buffered data is done
+        '''
+        self.put(None)
+    
+    def join(self, timeout=None):
+        '''
+        Wait until processing has stopped, must not be called from 
+        the event loop
+        
+        Parameters
+        ----------
+        timeout : float, optional
+            maximum time to wait in seconds, default is no limit
+        '''
+        self._closed.wait(timeout)
+    
+    def is_alive(self):
+        return not self._closed.is_set()
+
+
+class GroupConsumer(_QueueStats, threading.Thread):
+    '''
+    Consumer of the bars of many Seises together
+    
+    After every poll cycle of the live feed the new bars of all member
+    Seises of the cycle are passed to the callback in one DataFrame 
+    indexed by symbol, together with the members which did not deliver
+    a bar. Members are a fixed set of Seises or every polled Seis with
+    the given interval. The callback is called in a separate thread.
+    
+    Parameters
+    ----------
+    tvdatafeed : TvDatafeedLive
+        live feed the consumer is registered with
+    callback : func
+        function protoype must be func_name(data, complete, late) 
+        where data is a DataFrame with datetime, open, high, low, close
+        and volume columns indexed by "EXCHANGE:SYMBOL", complete is 
+        True if every member delivered and late is a list of the 
+        symbols which did not
+    seises : iterable of Seis, optional
+        member Seises, not used if interval is given
+    interval : str, optional
+        interval value, every Seis with this interval is a member
+    capacity : int, optional
+        maximum number of batches waiting for the callback, default is
+        no limit
+    policy : str, optional
+        what to do with a new batch when capacity batches are waiting,
+        see ConsumerQueue (default "block")
+    
+    Methods
+    -------
+    put(data, late)
+        Put new batch into buffer to be processed
+    includes(seis)
+        True if Seis is a member
+    del_consumer()
+        Shutdown the callback thread and remove from live feed
+    start()
+        start data processing and callback thread
+    stop()
+        Stop the data processing and callback thread
+    '''
+    def __init__(self, tvdatafeed, callback, seises=None, interval=None, capacity=None, policy="block"):
+        super().__init__()
+        
+        self._buffer=ConsumerQueue(capacity, policy)
+        self.tvdatafeed=tvdatafeed
+        self.callback=callback
+        self.interval=interval
+        self.seises=None if interval is not None else frozenset(seises)
+        self.name=self.callback.__name__+"_group_"+(interval if interval is not None else str(len(self.seises)))
+    
+    def __repr__(self):
+        members=repr(self.interval) if self.interval is not None else f"{len(self.seises or ())} seises"
+        return f'GroupConsumer({members},{getattr(self.callback, "__name__", None)})'
+    
+    def includes(self, seis):
+        '''
+        True if Seis is a member
+        '''
+        if self.interval is not None:
+            return seis.interval.value == self.interval
+        
+        return seis in self.seises
+    
+    def run(self):
+        # callback thread tasks
+        while True:
+            batch=self._buffer.get()
+            if batch is None:
+                break
+            
+            data, late = batch
+            try: # in case user provided function throws an exception
+                with tracing.span("tvdatafeed.consumer.group_callback", callback=self.callback.__name__, symbols=len(data)):
+                    self.callback(data, not late, late)
+            except Exception as e: # remove the consumer from live feed and close down gracefully
+                self.del_consumer()
+                self.tvdatafeed=None # delete references
+                self.callback=None
+                self._buffer.close()
+                raise e from None
+        
+        self.tvdatafeed=None # delete references
+        self.callback=None
+        self._buffer.close()
+    
+    def put(self, data, late=()):
+        '''
+        Put new batch into buffer to be processed
+        
+        Parameters
+        ----------
+        data : pandas.DataFrame
+            new bars indexed by symbol
+        late : list
+            symbols of members which did not deliver a bar
+        '''
+        self._buffer.put((data, list(late)))
+    
+    def del_consumer(self, timeout=-1):
+        '''
+        Stop the callback thread and remove from live feed
+        
+        Parameters
+        ----------
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        
+        Returns
+        -------
+        boolean
+            True if successful, False if timed out.
+        '''
+        return self.tvdatafeed.del_group_consumer(self, timeout)
+    
     def stop(self):
         '''
         Stop the data processing and callback thread
         '''
         self._buffer.put(None)
-        
\ No newline at end of file
@@ -1,11 +1,24 @@
-import threading, queue, time, logging
+import threading, queue, time, logging, contextvars, heapq, asyncio, inspect
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import tvDatafeed 
-from datetime import datetime as dt
-from dateutil.relativedelta import relativedelta as rd
+from tvDatafeed import tracing
+from tvDatafeed.stream import ChartStream
+from tvDatafeed.ticks import BarRule, TickAggregator
+from tvDatafeed.health import SeisHealth, RetryBudget
+from tvDatafeed.lag import LagPlanner
+from tvDatafeed.consumer import PooledConsumer, AsyncConsumer, GroupConsumer
+from tvDatafeed.bar import Bar
+from tvDatafeed.interval import CustomInterval
+from datetime import datetime as dt, timezone
 
 logger = logging.getLogger(__name__)
 
 RETRY_LIMIT=50 # max number of retries to get valid data from tvDatafeed; TODO: think about creating a conf file for such parameters
+RETRY_BUDGET=5 # average number of retries per Seis one poll cycle may spend in total
+RETRY_WINDOW=30 # max seconds spent retrying one Seis, at most half of its interval
+MAX_BACKOFF=2 # max seconds between two retries
+CLOCK_CHECK=5 # max seconds between two checks of the wall clock while waiting for an expiry
+LAG_DECAY=0.9 # share of the request time recorded as lag when the first request already got the bar
 
 class TvDatafeedLive(tvDatafeed.TvDatafeed):
     """                 
@@ -26,19 +39,52 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         TradingView username (default None)
     password : str, optional
         TradingView password (default None)
+    rate_limiter : RateLimiter, optional
+        request budgets, defaults to the process wide limiter
+        shared by all instances
+    metrics_sink : MetricsSink, optional
+        receives timing breakdown of every upstream request
+        (default None)
+    streaming : bool, optional
+        receive bars pushed over one persistent chart session
+        instead of polling get_hist when intervals expire
+        (default False)
+    fetch_workers : int, optional
+        number of Seises fetched concurrently when their intervals
+        expire, each worker uses its own connection (default 8)
+    on_error : func, optional
+        called as func_name(seis, health) when a Seis fails to 
+        deliver a new bar in a poll cycle, health is its SeisHealth
+        (default None)
+    lag_planner : LagPlanner, optional
+        learns how long after the close bars become available per 
+        exchange and interval and times the requests accordingly,
+        defaults to a new LagPlanner
+    consumer_workers : int, optional
+        run consumer callbacks on a shared pool of this many worker
+        threads instead of one thread per consumer (default None, 
+        one thread per consumer)
     
     Methods
     -------
     new_seis(symbol, exchange, interval, timeout)
         Create and add new Seis to live feed
+    new_tick_seis(symbol, exchange, bars, timeout)
+        Create Seis with bars built locally from quote ticks
     del_seis(seis, timeout)
         Remove Seis from live feed
-    new_consumer(seis, callback, timeout)
+    new_consumer(seis, callback, timeout, pooled, capacity, policy, loop, concurrency, as_frame)
         Create a new consumer for Seis with provided callback
     del_consumer(consumer, timeout)
         Remove the consumer from Seis consumers list
+    new_group_consumer(members, callback, timeout, capacity, policy)
+        Create a consumer receiving the bars of many Seises together
+    del_group_consumer(consumer, timeout)
+        Remove a group consumer
     get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session, timeout)
         Get historic ticker data
+    get_status(seis)
+        Poll health of one or all Seises
     del_tvdatafeed
         Stop and delete this object
     """
@@ -46,69 +92,157 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
     class _SeisesAndTrigger(dict):
         # Internal class to contain an array of Seis objects
         # and to manage/track their interval update times
+        #
+        # Maps interval value to [seises, expiry datetime, timeframe, 
+        # since] where seises is a dict of Seis by (symbol, exchange, 
+        # interval value) and since the expiry before the current one,
+        # bars closing after it are the new ones of the next cycle. All
+        # Seises are also indexed by that key and the expiries are kept
+        # in a min-heap, entries which no longer match their group are
+        # dropped lazily when they reach the top.
+        # The heap and the groups are only changed under _heap_lock as
+        # the main loop reads them while waiting. If next_open is set, 
+        # expiries skip bars in which none of the group's Seises trades.
+        #
+        # Expiries are aware datetimes on the bar boundaries of the 
+        # group, in the timezone of the datetime the group was created
+        # with (the exchange timezone). Waiting is done against the 
+        # monotonic clock and re-anchored when the wall clock jumps.
         def __init__(self):
             super().__init__()
             
+            self._index={} # (symbol, exchange, interval value) -> Seis
+            self._heap=[] # (expiry datetime, interval value)
+            self._heap_lock=threading.RLock()
+            self.next_open=None # func(seises, moment) -> first aware datetime >= moment any of seises trades
             self._trigger_quit=False
             self._trigger_dt=None
             self._trigger_interrupt=threading.Event()
+        
+        @staticmethod
+        def _timeframe(interval):
+            # time period of interval group as relativedelta, works for
+            # native and custom intervals alike
+            return tvDatafeed.Interval.custom(interval).timeframe
+        
+        @staticmethod
+        def _key(seis):
+            return (seis.symbol, seis.exchange, seis.interval.value)
+        
+        @staticmethod
+        def _add(moment, timeframe, times=1):
+            # bar boundary times periods after moment; intraday periods
+            # are exact seconds, daily and longer ones keep the wall 
+            # time of the exchange across DST changes
+            if timeframe.years or timeframe.months or timeframe.days:
+                return moment + timeframe * times
+            
+            return (moment.astimezone(timezone.utc) + timeframe * times).astimezone(moment.tzinfo)
+        
+        def _align(self, expiry, timeframe, moment):
+            # first bar boundary after moment on the grid of expiry
+            if expiry > moment:
+                return expiry
             
-            # time periods available in TradingView 
-            self._timeframes={"1":rd(minutes=1), "3":rd(minutes=3), "5":rd(minutes=5), \
-                             "15":rd(minutes=15), "30":rd(minutes=30), "45":rd(minutes=45), \
-                             "1H":rd(hours=1), "2H":rd(hours=2), "3H":rd(hours=3), "4H":rd(hours=4), \
-                             "1D":rd(days=1), "1W":rd(weeks=1), "1M":rd(months=1)}
+            step=(self._add(expiry, timeframe) - expiry).total_seconds()
+            times=int((moment - expiry).total_seconds() // step)
+            while times > 0 and self._add(expiry, timeframe, times) > moment: # months differ in length
+                times-=1
+            expiry=self._add(expiry, timeframe, times)
+            while expiry <= moment:
+                expiry=self._add(expiry, timeframe)
+            
+            return expiry
+        
+        def _advance(self, group, expiry):
+            # end of the bar after the one ending at expiry. If none of 
+            # the group trades at that moment the bar closed with its 
+            # session and only becomes bars[-2] once the next session 
+            # opens, so the trigger moves to that open where the bars 
+            # of the new session start
+            timeframe=group[2]
+            expiry=self._add(expiry, timeframe)
+            if self.next_open is None:
+                return expiry
+            
+            opened=self.next_open(group[0].values(), expiry)
+            if opened is not None and opened > expiry:
+                expiry=opened
+            
+            return expiry
+        
+        def timeframe(self, interval_key):
+            # time period of interval group
+            return super().__getitem__(interval_key)[2]
         
         def _next_trigger_dt(self):
             # Get the next closest expiry datetime
-            if not self.values(): # if Seis list is empty
-                return None
-            
-            interval_dt_list=[]
-            for values in self.values():
-                interval_dt_list.append(values[1])
+            with self._heap_lock:
+                heap=self._heap
+                while heap:
+                    expiry, interval=heap[0]
+                    group=super().get(interval)
+                    if group is not None and group[1] == expiry:
+                        return expiry
+                    heapq.heappop(heap) # stale entry of a removed or rescheduled group
             
-            interval_dt_list.sort()
-
-            return interval_dt_list[0]
+            return None
 
         def get_seis(self, symbol, exchange, interval):
             # Returns Seis object listed in SAT based on
             # symbol, exchange and interval. If not listed then 
             # None is returned
-            for seis in self:
-                if seis.symbol==symbol and seis.exchange==exchange and seis.interval==interval:
-                    return seis
-            
-            return None
+            return self._index.get((symbol, exchange, interval.value))
             
         def wait(self):
             # Wait until next interval(s) expire
             # returns true after waiting, even if interrupted. Returns False only
             # when interrupted for shutdown
-            if not self._trigger_quit: # if not quitting then we can clear interrupt before sarting the wait
+            while not self._trigger_quit:
                 self._trigger_interrupt.clear() # in case it was set by adding/removing new Seis
-            
-            self._trigger_dt=self._next_trigger_dt() # get new expiry datetime
-            
-            while True: # might need to restart waiting if trigger_dt changes and interrupted when waiting
-                wait_time=self._trigger_dt-dt.now() # calculate the time to next expiry
+                self._trigger_dt=self._next_trigger_dt() # get new expiry datetime
                 
-                if (interrupted := self._trigger_interrupt.wait(wait_time.total_seconds())) and self._trigger_quit: # if we received a shutdown event during waiting
-                    return False 
-                elif not interrupted: # if not interrupted then no more waiting needed
-                    self._trigger_interrupt.clear() # in case waiting was interrupted, but not quit - reset the event flag
-                    break
-
-            return True
+                if self._trigger_dt is None:
+                    self._trigger_interrupt.wait()
+                    continue
+                
+                # map the expiry onto the monotonic clock, the offset 
+                # between both clocks changes only when the wall clock 
+                # is stepped (NTP, manual change, suspend)
+                offset=time.time() - time.monotonic()
+                deadline=self._trigger_dt.timestamp() - offset
+                while (timeout := deadline - time.monotonic()) > 0:
+                    if self._trigger_interrupt.wait(min(timeout, CLOCK_CHECK)):
+                        break # interrupted - shutting down or expiries changed, check again
+                    
+                    if abs((jump := time.time() - time.monotonic() - offset)) > 1: # wall clock jumped, re-anchor
+                        logger.info(f"wall clock jumped by {jump:.1f}s, re-anchoring interval expiries")
+                        offset+=jump
+                        deadline-=jump
+                else:
+                    return True
+            
+            return False
             
         def get_expired(self):
-            # return expired intervals in a list, update expiry values
-            expired_intervals=[]
-            for interval, values in self.items():
-                if dt.now() >= values[1]:
-                    expired_intervals.append(interval)
-                    values[1]= values[1] + self._timeframes[interval] # add interval to get new expiry dt in future
+            # return expired intervals in a dict, update expiry values. 
+            # Values are (newer_than, expected) epoch timestamps: the 
+            # new bar of the interval starts after newer_than, older 
+            # bars are stale, and on the group's bar boundaries it 
+            # starts at expected, the expiry before the one that fired
+            expired_intervals={}
+            now=dt.now(timezone.utc)
+            with self._heap_lock:
+                while (expiry := self._next_trigger_dt()) is not None and expiry <= now:
+                    interval=heapq.heappop(self._heap)[1]
+                    expired_intervals[interval]=None # a group removed and added again can have two matching entries
+                
+                for interval in expired_intervals: # every group advances by one interval per call
+                    group=super().__getitem__(interval)
+                    since, group[3] = group[3], group[1]
+                    expired_intervals[interval]=(self._add(since, group[2], -1).timestamp(), since.timestamp())
+                    group[1]=self._advance(group, group[1]) # add interval, or more if market is closed, to get new expiry dt in future
+                    heapq.heappush(self._heap, (group[1], interval))
             
             return expired_intervals
         
@@ -123,31 +257,45 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         
         def append(self, seis, update_dt=None):
             # append new Seis instance into list
-            if self: # if empty then reset flags
+            if not self: # if empty then reset flags
                 self._trigger_quit=False
                 self._trigger_interrupt.clear()
-                
+            
+            key=self._key(seis)
             if seis.interval.value in self.keys(): # interval group already exists
-                super().__getitem__(seis.interval.value)[0].append(seis)
+                super().__getitem__(seis.interval.value)[0][key]=seis
             else: # new interval group needs to be created
                 if update_dt is None:
                     raise ValueError("Missing update datetime for new interval group")
                 else:
-                    update_dt= update_dt + self._timeframes[seis.interval.value] # change the time to next update datetime (result will be datetime object)
-                    self.__setitem__(seis.interval.value, [[seis], update_dt]) 
+                    update_dt=update_dt.astimezone() if update_dt.tzinfo is None else update_dt # naive is local time
+                    timeframe=self._timeframe(seis.interval.value)
+                    group=[{key: seis}, None, timeframe, update_dt]
+                    group[1]=self._advance(group, update_dt) # change the time to next update datetime (result will be datetime object)
+                    expiry=self._align(group[1], timeframe, self._add(dt.now(update_dt.tzinfo), timeframe, -1))
+                    if expiry != group[1]: # update_dt is old, skip to the latest closed bar
+                        group[1], group[3] = expiry, self._add(expiry, timeframe, -1)
+                    with self._heap_lock:
+                        self.__setitem__(seis.interval.value, group) 
+                        heapq.heappush(self._heap, (group[1], seis.interval.value))
                     
                     if (trigger_dt := self._next_trigger_dt()) != self._trigger_dt: # if new interval group expiry is sooner than current expiry being waited on
                         self._trigger_dt=trigger_dt
                         self._trigger_interrupt.set()
+            
+            self._index[key]=seis
            
         def discard(self, seis):
             # remove Seis instance from the list
             if seis not in self:
                 raise KeyError("No such Seis in the list")
             else:
-                super().__getitem__(seis.interval.value)[0].remove(seis)
+                key=self._key(seis)
+                del self._index[key]
+                del super().__getitem__(seis.interval.value)[0][key]
                 if not super().__getitem__(seis.interval.value)[0]: # if interval group now empty then remove it
-                    self.pop(seis.interval.value)    
+                    with self._heap_lock:
+                        self.pop(seis.interval.value) # its heap entry goes stale
                     
                     if ((trigger_dt := self._next_trigger_dt()) != self._trigger_dt) and (self._trigger_quit is False): # if interval group expiry dt was being waited on and havent quit
                         self._trigger_dt=trigger_dt
@@ -158,29 +306,56 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             return self.keys()
         
         def __getitem__(self, interval_key):
-            return super().__getitem__(interval_key)[0]
+            return list(super().__getitem__(interval_key)[0].values())
         
         def __iter__(self):
-            seises_list=[]
-            
-            for seis_list in super().values():
-                seises_list+=seis_list[0]
-            
-            return seises_list.__iter__()
+            return iter(self._index.values())
         
         def __contains__(self, seis):
-            for seis_list in super().values():
-                if seis in seis_list[0]:
-                    return True
-            
-            return False
+            return self._index.get(self._key(seis)) == seis
+    
+    class _Poll(object):
+        # Internal class to track the retrieval of the new bar of one 
+        # Seis in a poll cycle. It is advanced one request at a time by
+        # _poll_attempt, due is the monotonic time of the next request
+        # and bar the result once the poll is done.
+        __slots__=("seis", "planned", "budget", "deadline", "closed_at", "learn", "newer_than", "expected", "attempt", "tried", "backoff", "due", "bar")
+        
+        def __init__(self, seis, planned, budget, deadline, closed_at, learn, newer_than, expected):
+            self.seis=seis
+            self.planned=planned
+            self.budget=budget
+            self.deadline=deadline
+            self.closed_at=closed_at
+            self.learn=learn
+            self.newer_than=newer_than
+            self.expected=expected
+            self.attempt=0 # number of failed requests
+            self.tried=None # seconds after the close when the last failed request was sent
+            self.backoff=0.1
+            self.due=closed_at + planned[0] # bar is not expected to be available earlier
+            if deadline is not None:
+                self.due=min(self.due, deadline)
+            self.bar=None
     
-    def __init__(self, username=None, password=None):
-        super().__init__(username, password)
+    def __init__(self, username=None, password=None, rate_limiter=None, metrics_sink=None, streaming=False, fetch_workers=8, on_error=None, lag_planner=None, consumer_workers=None):
+        super().__init__(username, password, rate_limiter, metrics_sink)
         
         self._lock=threading.Lock()
         self._main_thread = None  
         self._sat = self._SeisesAndTrigger() 
+        self._streaming = streaming # bars are pushed by a chart stream instead of polling
+        self._stream = None # ChartStream, created with the first Seis and stopped with the last
+        self._ticks = None # TickAggregator, created with the first tick Seis
+        self._fetch_workers = max(1, fetch_workers)
+        self._fetch_pool = None # created by the main loop
+        self._health = {} # (symbol, exchange, interval value) -> SeisHealth
+        self.on_error = on_error
+        self.lag_planner = lag_planner if lag_planner is not None else LagPlanner()
+        self._consumer_workers = consumer_workers
+        self._groups = () # GroupConsumers, replaced on change
+        self._consumer_pool = ThreadPoolExecutor(max_workers=consumer_workers, thread_name_prefix="tvdatafeed_consumer") # starts threads only when used
+        self._sat.next_open = self._next_open # sleep through closed market hours
     
     def _args_invalid(self, symbol, exchange):
         # check if provided arguemnts are valid and that such
@@ -214,8 +389,9 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             ticker string for symbol
         exchange : str
             exchange where symbol is listed
-        interval : tvDatafeed.Interval
-            chart interval
+        interval : tvDatafeed.Interval or str
+            chart interval, custom intervals such as "10" or "2D"
+            are accepted as well (see Interval.custom)
         
         timeout : int, optional
             maximum time to wait in seconds for return, default
@@ -235,6 +411,8 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             If provided symbol and exchange combination is
             not listed on TradingView
         '''
+        interval=tvDatafeed.Interval.custom(interval)
+        
         if self._args_invalid(symbol, exchange):
             raise ValueError("Provided symbol and exchange combination is not listed in TradingView")
         
@@ -242,35 +420,116 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
             return seis
         
         new_seis=tvDatafeed.Seis(symbol, exchange, interval)
+        if self._streaming:
+            update_dt=dt.now(timezone.utc) # streamed bars need no expiry datetime
+        else:
+            # prime the Seis without the lock: the newest closed bar is
+            # not new to it, and the open bar starts on a bar boundary
+            # of the symbol - a new interval group expires when it closes
+            bars=super().get_bars(new_seis.symbol, new_seis.exchange, new_seis.interval, n_bars=2) # get ticker data bar for this symbol from TradingView
+            if not bars:
+                raise ValueError(f"No data received for {symbol} on {exchange}")
+            if len(bars) > 1:
+                new_seis.is_new_data(bars[-2])
+            session=self.get_session(new_seis.symbol, new_seis.exchange)
+            update_dt=dt.fromtimestamp(bars[-1].time, None if session is None else session.timezone)
         
+        # the lock is only held to check and modify the lists
         if self._lock.acquire(timeout=timeout) is False:
             return False
         
-        new_seis.tvdatafeed=self
-        
         # if this seis is already in list 
-        if new_seis in self._sat:
-            return self._sat.get_seis(symbol, exchange, interval)
+        if seis := self._sat.get_seis(symbol, exchange, new_seis.interval):
+            self._lock.release()
+            return seis
         
         # add to interval group - if interval group does not exists then create one
-        interval_key=new_seis.interval.value
-        if interval_key not in self._sat.intervals():
-            # get last bar update datetime value for the Seis
-            ticker_data=super().get_hist(new_seis.symbol, new_seis.exchange, new_seis.interval, n_bars=2) # get ticker data bar for this symbol from TradingView
-            update_dt=ticker_data.index.to_pydatetime()[0] # extract datetime of when this bar was produced/released
-            # append this seis into SAT
-            self._sat.append(new_seis, update_dt)
-        else:
-            self._sat.append(new_seis)
+        new_seis.tvdatafeed=self
+        self._sat.append(new_seis, update_dt)
         
-        self._lock.release()
+        if self._streaming:
+            if self._stream is None:
+                self._stream = ChartStream(self, self._on_stream_bar)
+            stream=self._stream
+            self._lock.release()
+            
+            stream.add(new_seis) # waits for the rate limiter, not under the lock
+            with self._lock:
+                if self._stream is stream and new_seis in self._sat:
+                    stream.start()
+                    return new_seis
+            stream.discard(new_seis) # removed meanwhile
+            return new_seis
         
         if self._main_thread is None: # if main thread is not running then start 
             self._main_thread = threading.Thread(name="main_loop", target=self._main_loop)
             self._main_thread.start() 
         
+        self._lock.release()
+        
         return new_seis
         
+    def new_tick_seis(self, symbol, exchange, bars, timeout=-1):
+        '''
+        Create Seis with bars built locally from quote ticks
+        
+        Bars are aggregated from real-time quote updates instead of 
+        being retrieved from TradingView, so resolutions TradingView 
+        does not provide for the symbol are possible. Consumers are 
+        added and removed the same way as for any other Seis.
+        
+        Parameters
+        ----------
+        symbol : str 
+            ticker string for symbol
+        exchange : str
+            exchange where symbol is listed
+        bars : str
+            time interval such as "5S" or "10S", tick count bars 
+            such as "100T" or volume bars such as "5000V"
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+            
+        Returns
+        ----------
+        Seis
+            If such Seis already existed then that will be returned,
+            otherwise new will be created. If timeout was specified 
+            and expired then False will be returned.
+        
+        Raises
+        ----------
+        ValueError
+            If provided symbol and exchange combination is not 
+            listed on TradingView or bars is not a valid rule
+        '''
+        new_seis=tvDatafeed.Seis(symbol, exchange, BarRule(bars))
+        
+        if self._args_invalid(symbol, exchange):
+            raise ValueError("Provided symbol and exchange combination is not listed in TradingView")
+        
+        if self._lock.acquire(timeout=timeout) is False:
+            return False
+        
+        if self._ticks is None:
+            self._ticks=TickAggregator(self, self._on_tick_bar)
+        
+        for seis in self._ticks: # if Seis with such parameters already exists then simply return that
+            if seis == new_seis:
+                self._lock.release()
+                return seis
+        
+        new_seis.tvdatafeed=self
+        self._ticks.add(new_seis)
+        self._lock.release()
+        
+        return new_seis
+    
+    def _listed(self, seis):
+        # True if Seis is in live feed, polled or built from ticks
+        return seis in self._sat or (self._ticks is not None and seis in self._ticks)
+    
     def del_seis(self, seis, timeout=-1):
         '''
         Remove Seis from live feed
@@ -293,18 +552,31 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         ValueError
             If Seis does not exist in live feed (has not been added)
         '''
-        if seis not in self._sat:
+        if not self._listed(seis):
             raise ValueError("Seis is not listed")
         
         if self._lock.acquire(timeout=timeout) is False:
             return False
         # close all the callback threads for this Seis
         for consumer in seis.get_consumers():
+            seis.pop_consumer(consumer)
             consumer.put(None) # None signals closing for the callback thread
+        
+        if isinstance(seis.interval, BarRule): # built from ticks, not in SAT
+            self._ticks.discard(seis)
+            del seis.tvdatafeed
+            self._lock.release()
+            return True
                 
         # remove Seis from MAR list
         self._sat.discard(seis)
+        self._health.pop((seis.symbol, seis.exchange, seis.interval.value), None)
         del seis.tvdatafeed
+        stream=None
+        if self._stream is not None:
+            self._stream.discard(seis)
+            if not self._sat: # last streamed Seis, stop the connection
+                stream, self._stream = self._stream, None
         
         # if SAT list empty now then close down main loop
         if not self._sat:
@@ -312,9 +584,12 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         
         self._lock.release()
         
+        if stream is not None: # joins the stream thread, not under the lock
+            stream.stop()
+        
         return True
     
-    def new_consumer(self, seis, callback, timeout=-1):
+    def new_consumer(self, seis, callback, timeout=-1, pooled=None, capacity=None, policy="block", loop=None, concurrency=1, as_frame=False):
         '''
         Create a new Consumer for this Seis with provided callback
         
@@ -322,15 +597,40 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         ----------
         seis : Seis
             Seis object for which the Consumer object is created
-        callback : func
-            Callback function to be called when Seis has new data
+        callback : func or coroutine function
+            Callback function to be called as func_name(seis, data) 
+            when Seis has new data, data is a Bar shared by all 
+            consumers. A coroutine function is run as tasks on the 
+            event loop.
         timeout : int, optional
             maximum time to wait in seconds for return, default
             is -1 (blocking)
+        pooled : bool, optional
+            run the callback on the shared consumer pool instead of a
+            thread of its own, default is to use the pool if 
+            consumer_workers was given
+        capacity : int, optional
+            maximum number of bars waiting for the callback, default
+            is no limit
+        policy : str, optional
+            when capacity bars are waiting: "block" makes the live 
+            feed wait, "drop_oldest" and "drop_newest" discard a bar,
+            "latest" keeps only the newest bar whatever the capacity
+            (default "block")
+        loop : asyncio.AbstractEventLoop, optional
+            event loop for a coroutine function callback, default is
+            the running loop of the calling thread
+        concurrency : int, optional
+            maximum number of tasks of a coroutine function callback
+            running at the same time, None for no limit. With the 
+            default of 1 bars are processed in order.
+        as_frame : bool, optional
+            pass bars as one-row DataFrames in get_hist format instead
+            of Bar tuples (default False)
         
         Returns
         ----------
-        Consumer
+        Consumer, PooledConsumer or AsyncConsumer
             Contains reference to provided Seis and callback function.
             If timeout was specified and expired then False will be 
             returned.
@@ -338,13 +638,27 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         Raises
         ----------
         ValueError
-            If Seis does not exist in live feed (has not been added)
+            If Seis does not exist in live feed (has not been added) or
+            no event loop is given for a coroutine function callback
         '''
-        if seis not in self._sat:
+        if not self._listed(seis):
             raise ValueError("Seis is not listed")
         
+        if pooled is None:
+            pooled=self._consumer_workers is not None
+        
         # new consumer to hold callback related info
-        consumer=tvDatafeed.Consumer(seis, callback)
+        if inspect.iscoroutinefunction(callback):
+            if loop is None:
+                try:
+                    loop=asyncio.get_running_loop()
+                except RuntimeError:
+                    raise ValueError("An event loop is needed for a coroutine function callback") from None
+            consumer=AsyncConsumer(seis, callback, loop, concurrency, capacity, policy, as_frame)
+        elif pooled:
+            consumer=PooledConsumer(seis, callback, self._consumer_pool, capacity, policy, as_frame)
+        else:
+            consumer=tvDatafeed.Consumer(seis, callback, capacity, policy, as_frame)
         if self._lock.acquire(timeout=timeout) is False:
             return False
         seis.add_consumer(consumer)     
@@ -378,6 +692,367 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         
         return True
         
+    def new_group_consumer(self, members, callback, timeout=-1, capacity=None, policy="block"):
+        '''
+        Create a consumer receiving the bars of many Seises together
+        
+        After every poll cycle the callback gets the new bars of all 
+        members polled in that cycle as one DataFrame indexed by 
+        symbol, a flag which is True if all of them delivered and the 
+        list of symbols which did not. Members whose market is closed
+        are not expected.
+        
+        Parameters
+        ----------
+        members : list of Seis, tvDatafeed.Interval, CustomInterval or str
+            Seises to receive bars of, or an interval to receive bars
+            of every Seis with that interval, including Seises added
+            later
+        callback : func
+            function protoype must be func_name(data, complete, late)
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        capacity : int, optional
+            maximum number of batches waiting for the callback, 
+            default is no limit
+        policy : str, optional
+            "block", "drop_oldest", "drop_newest" or "latest", what to
+            do with a new batch when capacity batches are waiting 
+            (default "block")
+        
+        Returns
+        ----------
+        GroupConsumer
+            If timeout was specified and expired then False will be 
+            returned.
+            
+        Raises
+        ----------
+        ValueError
+            If a Seis is not polled in live feed or the live feed is
+            streaming
+        '''
+        if self._streaming:
+            raise ValueError("Group consumers need a polling live feed")
+        
+        if isinstance(members, (str, tvDatafeed.Interval, CustomInterval)):
+            consumer=GroupConsumer(self, callback, interval=tvDatafeed.Interval.custom(members).value, capacity=capacity, policy=policy)
+        else:
+            members=list(members)
+            if not all(seis in self._sat for seis in members):
+                raise ValueError("Seis is not listed")
+            consumer=GroupConsumer(self, callback, seises=members, capacity=capacity, policy=policy)
+        
+        if self._lock.acquire(timeout=timeout) is False:
+            return False
+        self._groups=self._groups + (consumer,) # copy on write, poll cycles iterate without the lock
+        consumer.start()
+        self._lock.release()
+        
+        return consumer
+    
+    def del_group_consumer(self, consumer, timeout=-1):
+        '''
+        Remove a group consumer
+        
+        Parameters
+        ----------
+        consumer : GroupConsumer
+            consumer to be removed
+        timeout : int, optional
+            maximum time to wait in seconds for return, default
+            is -1 (blocking)
+        
+        Returns
+        -------
+        boolean
+            True if successful, False if timed out.
+        '''
+        if self._lock.acquire(timeout=timeout) is False:
+            return False
+        self._groups=tuple(group for group in self._groups if group is not consumer)
+        consumer.stop()
+        self._lock.release()
+        
+        return True
+    
+    def get_status(self, seis=None):
+        '''
+        Poll health of one or all Seises
+        
+        Parameters
+        ----------
+        seis : Seis, optional
+            Seis to get health for, default is all polled Seises
+        
+        Returns
+        -------
+        SeisHealth or list
+            health of seis, or list of health of all Seises which 
+            have been polled at least once
+        '''
+        if seis is not None:
+            return self._health.get((seis.symbol, seis.exchange, seis.interval.value))
+        
+        return list(self._health.values())
+    
+    def _seis_health(self, seis):
+        return self._health.setdefault((seis.symbol, seis.exchange, seis.interval.value), SeisHealth(seis))
+    
+    def _poll_seis(self, seis, budget=None, deadline=None, closed_at=None, newer_than=None, expected=None):
+        # Retrieve the newest closed data bar for Seis
+        #
+        # get_bars returns the currently open bar last so 2 bars are 
+        # read to get the newest closed one, which is returned as Bar.
+        # If closed_at, the monotonic time of the bar close, is given 
+        # then the requests are timed by the learned publish lag of the
+        # exchange and interval. If new data is not available yet then
+        # retry at the planned times and after those with exponential 
+        # backoff until RETRY_LIMIT, the deadline or the cycle's retry 
+        # budget is reached. On failure None is returned - stale data 
+        # is never returned and other Seises are not affected. If 
+        # newer_than, an epoch timestamp, is given only a bar starting
+        # after it is taken as the new one. This blocks the calling 
+        # thread while waiting, _poll_pooled runs many polls without.
+        return self._run_poll(self._start_poll(seis, budget, deadline, closed_at, newer_than, expected))
+    
+    def _run_poll(self, poll):
+        # Send the requests of poll from this thread until it is done
+        while True:
+            if (pause := poll.due - time.monotonic()) > 0: # wait before (re)trying
+                time.sleep(pause)
+            if self._poll_attempt(poll):
+                return poll.bar
+    
+    def _start_poll(self, seis, budget=None, deadline=None, closed_at=None, newer_than=None, expected=None):
+        # _Poll of Seis, see _poll_seis for the parameters
+        learn=closed_at is not None
+        planned=self.lag_planner.schedule(seis.exchange, seis.interval) if learn else [0.0]
+        closed_at=time.monotonic() if closed_at is None else closed_at
+        
+        return self._Poll(seis, planned, budget, deadline, closed_at, learn, newer_than, expected)
+    
+    def _poll_attempt(self, poll):
+        # Send the next request of poll, returns True once the poll is
+        # done with poll.bar set, else poll.due is the time to retry.
+        #
+        # The lag is recorded if the new bar starts at poll.expected, 
+        # i.e. closed at poll.closed_at: the midpoint between the last
+        # failed and the successful request, or just under the time of
+        # the first request if that one succeeded. On failure the Seis
+        # health is updated and the error reported.
+        seis=poll.seis
+        health=self._seis_health(seis)
+        sent=time.monotonic() - poll.closed_at
+        with tracing.span("tvdatafeed.live.fetch", **tracing.seis_attributes(seis)):
+            try:
+                bars=super().get_bars(seis.symbol, seis.exchange, interval=seis.interval, n_bars=2)
+                error="no data" if not bars else "no new bar"
+            except Exception as e:
+                bars, error = None, e
+        
+        if bars and len(bars) > 1 and (poll.newer_than is None or bars[-2].time > poll.newer_than) and seis.is_new_data(bars[-2]): # check that it is the new bar, not an old one
+            health.record_success()
+            if poll.learn and bars[-2].time == poll.expected: # lag of a bar from another close would be wrong
+                if poll.tried is not None: # the bar became available between the last two requests
+                    self.lag_planner.record(seis.exchange, seis.interval, (poll.tried + sent) / 2)
+                else: # only an upper bound, shrink the estimate slowly
+                    self.lag_planner.record(seis.exchange, seis.interval, sent * LAG_DECAY)
+            poll.bar=bars[-2] # the last one is the yet un-closed bar
+            return True
+        
+        poll.attempt+=1
+        poll.tried=sent
+        if poll.attempt < len(poll.planned): # next planned attempt
+            poll.due=max(time.monotonic(), poll.closed_at + poll.planned[poll.attempt])
+        else:
+            poll.due=time.monotonic() + poll.backoff
+            poll.backoff=min(poll.backoff * 2, MAX_BACKOFF)
+        
+        if poll.attempt < RETRY_LIMIT and (poll.deadline is None or poll.due <= poll.deadline): # re-try maximum of RETRY_LIMIT times
+            if poll.budget is None or poll.budget.take():
+                return False
+            error=f"retry budget spent, last error: {error}"
+        
+        health.record_failure(error)
+        logger.warning(f"no new bar for {seis!r}: {error} ({health.state}, {health.failures} failed cycles)")
+        if self.on_error is not None:
+            try:
+                self.on_error(seis, health)
+            except Exception as e:
+                logger.error(f"on_error callback failed: {e}")
+        
+        return True
+    
+    def _poll_pooled(self, polls):
+        # Run the requests of polls on the fetch pool and yield (seis, 
+        # bar) of every poll once it is done. A poll waiting for its 
+        # next request is kept in a min-heap by due time and submitted
+        # again when due, so no worker sleeps between retries and Seises
+        # without a new bar never hold up the ones queued behind them.
+        waiting=[(poll.due, id(poll), poll) for poll in polls]
+        heapq.heapify(waiting)
+        running={}
+        while waiting or running:
+            while waiting and waiting[0][0] <= time.monotonic():
+                poll=heapq.heappop(waiting)[2]
+                running[self._fetch_pool.submit(contextvars.copy_context().run, self._poll_attempt, poll)]=poll
+            
+            timeout=max(0.0, waiting[0][0] - time.monotonic()) if waiting else None
+            if not running:
+                time.sleep(timeout)
+                continue
+            
+            done, _ = wait(running, timeout, FIRST_COMPLETED)
+            for future in done:
+                poll=running.pop(future)
+                if future.result():
+                    yield poll.seis, poll.bar
+                else:
+                    heapq.heappush(waiting, (poll.due, id(poll), poll))
+    
+    def _poll_group(self, seises, expired=None):
+        # Retrieve new bars of all seises concurrently and push every
+        # Seis to its consumers as soon as its own bar has arrived.
+        # Every worker keeps its own connection and chart session and
+        # reuses them for its fetches, so a cycle opens at most 
+        # fetch_workers connections and each fetch only replaces the
+        # series. A Seis waiting to retry gives its worker back to the
+        # other Seises until it is due. Seises with an open circuit are
+        # skipped until their cooldown is over. The cycle starts at the
+        # bar close so its start is the close time for the learned 
+        # publish lag. Group consumers get the bars of the cycle once 
+        # all fetches are done.
+        # expired maps the interval values to the (newer_than, 
+        # expected) bar start timestamps returned by get_expired.
+        now=dt.now(timezone.utc)
+        trading=[seis for seis in seises if self._trades(seis, now)]
+        seises=[seis for seis in trading if self._seis_health(seis).allow()]
+        delivered={}
+        if not seises:
+            self._put_groups(trading, delivered)
+            return
+        
+        budget=RetryBudget(max(RETRY_LIMIT, RETRY_BUDGET * len(seises)))
+        start=time.monotonic()
+        polls=[]
+        for seis in seises:
+            deadline=start + min(RETRY_WINDOW, self._interval_seconds(seis.interval) / 2)
+            newer_than, expected = (None, None) if expired is None else expired.get(seis.interval.value, (None, None))
+            polls.append(self._start_poll(seis, budget, deadline, start, newer_than, expected))
+        
+        if self._fetch_pool is None or len(seises) == 1:
+            results=((poll.seis, self._run_poll(poll)) for poll in polls)
+        else:
+            results=self._poll_pooled(polls)
+        
+        for seis, bar in results:
+            if bar is None or seis.tvdatafeed is not self: # failed and already reported, or removed meanwhile
+                continue
+            self._deliver(seis, bar)
+            delivered[seis]=bar
+        
+        self._put_groups(trading, delivered)
+    
+    def _put_groups(self, expected, delivered):
+        # pass the bars of a poll cycle to the group consumers whose 
+        # members were expected in the cycle
+        for group in self._groups:
+            members=[seis for seis in expected if group.includes(seis) and seis.tvdatafeed is self] # not removed meanwhile
+            if not members:
+                continue
+            
+            arrived=[seis for seis in members if seis in delivered]
+            late=[seis.exchange+":"+seis.symbol for seis in members if seis not in delivered]
+            group.put(self._batch(arrived, delivered), late)
+    
+    @staticmethod
+    def _batch(seises, delivered):
+        # DataFrame of the new bars of seises indexed by symbol
+        import pandas as pd
+        
+        rows=[(dt.fromtimestamp(bar.time),) + bar[1:] for bar in (delivered[seis] for seis in seises)]
+        return pd.DataFrame(rows, columns=["datetime", "open", "high", "low", "close", "volume"], 
+                            index=pd.Index([seis.exchange+":"+seis.symbol for seis in seises], name="symbol"))
+    
+    def _trades(self, seis, moment):
+        # True if market of Seis is open at moment, or if its trading 
+        # hours are unknown. Once closed its last bar is not published 
+        # as closed before the next session opens.
+        session=self.get_session(seis.symbol, seis.exchange)
+        if session is None:
+            return True
+        
+        return session.is_open(moment)
+    
+    def _next_open(self, seises, moment):
+        # first datetime at or after moment when any of seises trades,
+        # moment itself if trading hours of one are unknown and None if
+        # none of them opens within the next 30 days
+        opened=None
+        for session in {self.get_session(seis.symbol, seis.exchange) for seis in seises}:
+            if session is None:
+                return moment
+            if (session_open := session.next_open(moment)) is None:
+                continue
+            if session_open <= moment:
+                return moment
+            if opened is None or session_open < opened:
+                opened=session_open
+        
+        return opened
+    
+    @staticmethod
+    def _interval_seconds(interval):
+        now=dt.now()
+        return ((now + tvDatafeed.Interval.custom(interval).timeframe) - now).total_seconds()
+    
+    def _bar_data(self, seis, bar):
+        # one row DataFrame in get_hist format from a Bar
+        import pandas as pd
+        
+        data=pd.DataFrame([(bar.datetime,) + bar[1:]], 
+                          columns=["datetime", "open", "high", "low", "close", "volume"]).set_index("datetime")
+        data.insert(0, "symbol", value=seis.exchange+":"+seis.symbol)
+        return data
+    
+    def _deliver(self, seis, bar):
+        # push bar into all consumers of Seis, all of them share the 
+        # same Bar and the same DataFrame if they asked for one
+        data=None
+        for consumer in seis.get_consumers():
+            if consumer.as_frame:
+                if data is None:
+                    data=self._bar_data(seis, bar)
+                consumer.put(data)
+            else:
+                consumer.put(bar)
+    
+    def _on_stream_bar(self, seis, bar):
+        # called by the chart stream thread for every closed bar
+        # [timestamp, open, high, low, close, volume]
+        bar=Bar(int(bar[0]), *(float(value) for value in bar[1:6]))
+        if not seis.is_new_data(bar): # bar already delivered, e.g. replayed after reconnect
+            return
+        
+        with tracing.span("tvdatafeed.live.stream", **tracing.seis_attributes(seis)):
+            self._deliver(seis, bar)
+    
+    def _on_tick_bar(self, seis, bar):
+        # called by the tick aggregator for every completed bar
+        self._deliver(seis, Bar(int(bar[0]), *(float(value) for value in bar[1:6])))
+    
+    def _close_seises(self):
+        # send a shutdown signal to all the callback threads and
+        # empty SAT, must be called with the lock held
+        for seis in list(self._sat):
+            for consumer in seis.get_consumers():
+                seis.pop_consumer(consumer)
+                consumer.stop()
+            
+            self._sat.discard(seis)
+    
     def _main_loop(self):
         # Main thread to return ticker data
         #
@@ -389,43 +1064,34 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         # case first all the consumer threads are closed and then this 
         # main thread is closed. Once wait() method returns then we
         # get a list of intervals which were under monitor and have 
-        # expired. We loop through every Seis which has that 
-        # interval and retrieve new data and push it into all the 
-        # consumer threads that are added for that particular Seis.
+        # expired. Every Seis which has one of those intervals is 
+        # fetched concurrently and its new data is pushed into all the 
+        # consumer threads that are added for that particular Seis as
+        # soon as it arrives.
         #
-        # If fail to retrieve data then retry up to RETRY_LIMIT times 
-        # and if still fail then log the event (critical) and close
-        # down the consumer threads and the main loop itself.
+        # If fail to retrieve data then the Seis is retried with backoff
+        # and, if still failing, skipped for this cycle and reported 
+        # while all the other Seises keep being delivered.
+        
+        if self._fetch_workers > 1:
+            self._fetch_pool=ThreadPoolExecutor(max_workers=self._fetch_workers, thread_name_prefix="tvdatafeed_fetch")
         
         while self._sat.wait(): # waits until soonest expiry and returns True; returns False if closed                     
-            with self._lock:
-                for interval in self._sat.get_expired(): # returns a list of intervals that have expired
-                    for seis in self._sat[interval]: # go through all the seises in this interval group 
-                        for _ in range(0, RETRY_LIMIT): # re-try maximum of RETRY_LIMIT times
-                            data=super().get_hist(seis.symbol, seis.exchange, interval=seis.interval, n_bars=2) # get_hist returns bars starting with currently open so need to read 2 to get first closed
-                            if data is not None: # check that we did get any data
-                                if seis.is_new_data(data): # check that it is new data not old 
-                                    data=data.drop(labels=data.index[1]) # drop the row (last) which has yet un-closed bar data 
-                                    break
-                            
-                            time.sleep(0.1) # little time before retrying
-                        else: # limit reached, print an error into logs and gracefully shut down the main loop and consumer threads
-                            self._sat.quit()
-                            logger.critical("Failed to retrieve new data from TradingView")
-                        
-                        # push new data into all consumers that are expecting data for this Seis
-                        for consumer in seis.get_consumers():
-                            consumer.put(data)
+            with self._lock: # only to take a snapshot, fetching is done without the lock
+                expired=self._sat.get_expired() # returns a dict of intervals that have expired
+                seises=[seis for interval in expired for seis in self._sat[interval]]
+            
+            with tracing.span("tvdatafeed.live.poll", intervals=list(expired)):
+                # all seises of the expired interval groups are fetched together
+                self._poll_group(seises, expired)
+        
+        if self._fetch_pool is not None:
+            self._fetch_pool.shutdown()
+            self._fetch_pool=None
         
         # send a shutdown signal to all the callback threads
         with self._lock:
-            for seis in self._sat:
-                for consumer in seis.get_consumers():
-                    seis.pop_consumer(consumer)
-                    consumer.stop()
-                
-                self._sat.discard(seis)
-                
+            self._close_seises()
             self._main_thread = None
     
     def get_hist(self,  
@@ -461,28 +1127,50 @@ class TvDatafeedLive(tvDatafeed.TvDatafeed):
         Returns
         -------
         pd.Dataframe
-            dataframe with sohlcv as columns. If timeout was specified 
-            and expired then False will be returned.
+            dataframe with sohlcv as columns. The timeout argument is 
+            kept for compatibility, the request does not wait for the
+            live feed.
         '''
-        if self._lock.acquire(timeout=timeout) is False:
-            return False
-        data=super().get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session)
-        self._lock.release()
-        
-        return data
+        # TvDatafeed is safe to use from many threads so the fetch does
+        # not need the lock
+        return super().get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session)
        
     def __del__(self):
-        with self._lock:
-            self._sat.quit() #shutdown the main_loop
+        if self._ticks is not None:
+            self._ticks.stop()
+            with self._lock:
+                for seis in self._ticks:
+                    for consumer in seis.get_consumers():
+                        seis.pop_consumer(consumer)
+                        consumer.stop()
+                    self._ticks.discard(seis)
         
-        # wait until all threads are closed down - they are closed in the main_loop
-        if self._main_thread is not None:
-            self._main_thread.join() 
+        if self._streaming: # no main loop, close everything here
+            with self._lock:
+                stream, self._stream = self._stream, None
+            if stream is not None:
+                stream.stop()
+            with self._lock:
+                self._close_seises()
+        else:
+            with self._lock:
+                self._sat.quit() #shutdown the main_loop
+            
+            # wait until all threads are closed down - they are closed in the main_loop
+            if self._main_thread is not None:
+                self._main_thread.join() 
+        
+        self._consumer_pool.shutdown(wait=False) # consumers are stopped, workers finish their remaining bars
+        
+        with self._lock:
+            for group in self._groups:
+                group.stop()
+            self._groups=()
     
     def del_tvdatafeed(self): 
         '''
         Stop and delete this object
         '''
-        if self._main_thread is not None:
+        if self._main_thread is not None or self._stream is not None or self._ticks is not None or self._consumer_workers is not None or self._groups:
             self.__del__()  
         
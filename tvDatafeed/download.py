@@ -0,0 +1,241 @@
+import csv
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .interval import Interval
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "_manifest.jsonl"
+
+
+class DownloadJob(object):
+    """
+    Single symbol, exchange, interval and depth entry of a universe
+
+    Parameters
+    ----------
+    symbol : str
+        ticker string for symbol
+    exchange : str
+        exchange where symbol is listed
+    interval : Interval or CustomInterval
+        chart interval
+    n_bars : int
+        number of bars to download
+    """
+
+    def __init__(self, symbol, exchange, interval, n_bars):
+        self.symbol = symbol
+        self.exchange = exchange
+        self.interval = interval
+        self.n_bars = n_bars
+
+    def __repr__(self):
+        return f'DownloadJob("{self.symbol}","{self.exchange}",{self.interval!r},{self.n_bars})'
+
+    @property
+    def key(self):
+        # identifies the job in the checkpoint manifest
+        return f"{self.exchange}:{self.symbol}|{self.interval.value}|{self.n_bars}"
+
+    def path(self, out_dir):
+        # hive style partitioned output path for this job
+        return os.path.join(
+            out_dir,
+            f"interval={self.interval.value}",
+            f"exchange={self.exchange}",
+            f"{self.symbol}.parquet",
+        )
+
+
+def parse_interval(text):
+    """Parse interval given either as enum member name or resolution string
+
+    Args:
+        text (str): e.g. "in_1_hour", "1H", "10" or "2D"
+
+    Returns:
+        Interval | CustomInterval: parsed interval
+    """
+    text = text.strip()
+    if text in Interval.__members__:
+        return Interval[text]
+
+    return Interval.custom(text)
+
+
+def read_universe(path, n_bars=5000):
+    """Read universe file into a list of download jobs
+
+    The file is CSV with a header row containing symbol, exchange,
+    interval and optionally n_bars (or depth) columns. Empty lines and
+    lines starting with # are ignored.
+
+    Args:
+        path (str): path to universe file
+        n_bars (int, optional): depth used when the file has no n_bars column. Defaults to 5000.
+
+    Returns:
+        list: DownloadJob instances in file order
+    """
+    jobs = []
+    with open(path, newline="") as fh:
+        lines = (line for line in fh if line.strip() and not line.lstrip().startswith("#"))
+        for row in csv.DictReader(lines):
+            depth = row.get("n_bars") or row.get("depth") or n_bars
+            jobs.append(
+                DownloadJob(
+                    row["symbol"].strip(),
+                    row["exchange"].strip(),
+                    parse_interval(row["interval"]),
+                    int(depth),
+                )
+            )
+
+    return jobs
+
+
+class BulkDownloader(object):
+    """
+    Concurrent historical data downloader writing partitioned Parquet
+
+    Jobs are fetched by a pool of worker threads sharing one TvDatafeed
+    instance, every worker thread uses its own websocket connection.
+    Each symbol is written to its own Parquet file as soon as it
+    arrives, so memory use does not grow with the universe size.
+    Completed jobs are appended to a checkpoint manifest in the output
+    directory which lets an interrupted run resume where it stopped.
+
+    Parameters
+    ----------
+    tvdatafeed : TvDatafeed
+        instance used to fetch the data
+    out_dir : str
+        root directory of the Parquet dataset
+    concurrency : int, optional
+        number of parallel connections (default 4)
+    resume : bool, optional
+        skip jobs which are listed in the manifest (default True)
+    extended_session : bool, optional
+        download extended session data (default False)
+    progress_every : float, optional
+        seconds between progress reports, 0 disables (default 10)
+    """
+
+    def __init__(self, tvdatafeed, out_dir, concurrency=4, resume=True,
+                 extended_session=False, progress_every=10):
+        self.tvdatafeed = tvdatafeed
+        self.out_dir = out_dir
+        self.concurrency = concurrency
+        self.resume = resume
+        self.extended_session = extended_session
+        self.progress_every = progress_every
+
+        self._lock = threading.Lock()
+        self._manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        self._stats = None
+
+    def _completed(self):
+        # keys of jobs listed in the manifest
+        if not os.path.exists(self._manifest_path):
+            return set()
+
+        completed = set()
+        with open(self._manifest_path) as fh:
+            for line in fh:
+                try:
+                    completed.add(json.loads(line)["key"])
+                except (ValueError, KeyError):  # partially written last line
+                    continue
+
+        return completed
+
+    def _fetch(self, job):
+        # worker thread task: download, write and checkpoint one job
+        data = self.tvdatafeed.get_hist(
+            job.symbol,
+            job.exchange,
+            interval=job.interval,
+            n_bars=job.n_bars,
+            extended_session=self.extended_session,
+        )
+        if data is None or data.empty:
+            raise ValueError("no data returned")
+
+        path = job.path(self.out_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        data.to_parquet(tmp_path)
+        os.replace(tmp_path, path)  # never leave a truncated file behind
+
+        record = {"key": job.key, "path": path, "bars": len(data), "bytes": os.path.getsize(path)}
+        with self._lock:
+            with open(self._manifest_path, "a") as fh:
+                fh.write(json.dumps(record) + "\n")
+
+            self._stats["symbols"] += 1
+            self._stats["bars"] += record["bars"]
+            self._stats["bytes"] += record["bytes"]
+
+        return record
+
+    def _report(self, final=False):
+        with self._lock:
+            stats = dict(self._stats)
+
+        elapsed = max(time.monotonic() - stats["started"], 1e-9)
+        print(
+            "{}{} done, {} failed, {} skipped | {:.1f} symbols/s, {:.0f} bars/s, {:.1f} MB written".format(
+                "finished: " if final else "",
+                stats["symbols"],
+                stats["failed"],
+                stats["skipped"],
+                stats["symbols"] / elapsed,
+                stats["bars"] / elapsed,
+                stats["bytes"] / 1e6,
+            ),
+            flush=True,
+        )
+
+    def run(self, jobs):
+        """Download all jobs
+
+        Args:
+            jobs (list): DownloadJob instances
+
+        Returns:
+            dict: counters of symbols, bars, bytes, failed and skipped jobs and elapsed seconds
+        """
+        os.makedirs(self.out_dir, exist_ok=True)
+
+        completed = self._completed() if self.resume else set()
+        pending = [job for job in jobs if job.key not in completed]
+
+        self._stats = {"symbols": 0, "bars": 0, "bytes": 0, "failed": 0,
+                       "skipped": len(jobs) - len(pending), "started": time.monotonic()}
+        last_report = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="download") as pool:
+            futures = {pool.submit(self._fetch, job): job for job in pending}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"failed to download {futures[future]!r}: {e}")
+                    with self._lock:
+                        self._stats["failed"] += 1
+
+                if self.progress_every and time.monotonic() - last_report >= self.progress_every:
+                    last_report = time.monotonic()
+                    self._report()
+
+        self._report(final=True)
+
+        stats = dict(self._stats)
+        stats["elapsed"] = time.monotonic() - stats.pop("started")
+
+        return stats
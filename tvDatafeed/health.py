@@ -0,0 +1,112 @@
+import threading
+import time
+from datetime import datetime as dt, timedelta
+
+
+class SeisHealth(object):
+    """
+    Poll health of one Seis in the live feed
+
+    Every poll cycle in which no new bar could be retrieved counts as a
+    failure. After threshold consecutive failures the circuit opens and
+    the Seis is skipped for a cooldown period which doubles with every
+    further failure, up to max_cooldown. Once the cooldown is over one
+    poll cycle is let through (half open): success closes the circuit,
+    failure opens it again.
+
+    Attributes
+    ----------
+    seis : Seis
+        Seis this health belongs to
+    state : str
+        "ok", "failing" (failed, still polled), "open" (skipped until
+        retry_at) or "half_open" (on trial)
+    failures : int
+        consecutive failed poll cycles
+    last_error : str
+        reason of the last failure, None if never failed
+    last_success : datetime
+        when the last new bar was retrieved
+    retry_at : datetime
+        when an open circuit lets the next poll through
+    """
+
+    THRESHOLD = 3
+    COOLDOWN = 30.0
+    MAX_COOLDOWN = 1800.0
+
+    __slots__ = ("seis", "state", "failures", "last_error", "last_success", "retry_at", "_retry_at", "_lock")
+
+    def __init__(self, seis):
+        self.seis = seis
+        self.state = "ok"
+        self.failures = 0
+        self.last_error = None
+        self.last_success = None
+        self.retry_at = None
+        self._retry_at = None  # monotonic time of retry_at
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"SeisHealth({self.seis!r},state={self.state!r},failures={self.failures})"
+
+    def allow(self):
+        # True if the Seis should be polled in this cycle
+        with self._lock:
+            if self.state != "open":
+                return True
+            if time.monotonic() < self._retry_at:
+                return False
+            self.state = "half_open"
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "ok"
+            self.failures = 0
+            self.last_success = dt.now()
+            self.retry_at = self._retry_at = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.failures < self.THRESHOLD and self.state != "half_open":
+                self.state = "failing"
+                return
+
+            cooldown = min(self.COOLDOWN * 2 ** max(0, self.failures - self.THRESHOLD), self.MAX_COOLDOWN)
+            self.state = "open"
+            self._retry_at = time.monotonic() + cooldown
+            self.retry_at = dt.now() + timedelta(seconds=cooldown)
+
+
+class RetryBudget(object):
+    """
+    Number of retries one poll cycle may spend in total
+
+    Shared by all fetch workers of the cycle so a wide upstream outage
+    costs a bounded number of extra requests instead of every Seis
+    retrying to its own limit.
+
+    Parameters
+    ----------
+    retries : int
+        retries available
+    """
+
+    def __init__(self, retries):
+        self._left = retries
+        self._lock = threading.Lock()
+
+    @property
+    def left(self):
+        return self._left
+
+    def take(self):
+        # use one retry, False if the budget is spent
+        with self._lock:
+            if self._left <= 0:
+                return False
+            self._left -= 1
+            return True
@@ -0,0 +1,324 @@
+import datetime
+import enum
+import re
+
+# seconds resolutions which TradingView serves natively (premium plans)
+_UPSTREAM_SECONDS = ("1S", "5S", "10S", "15S", "30S")
+
+# interval unit -> (length of one unit in seconds, readable name)
+_UNITS = {"S": (1, "second"), "": (60, "minute"), "H": (3600, "hour"),
+          "D": (86400, "day"), "W": (604800, "week"), "M": (None, "month")}
+
+_INTERVAL_RE = re.compile(r"^(\d*)([SHDWM]?)$")
+
+
+class Interval(enum.Enum):
+    in_1_minute = "1"
+    in_3_minute = "3"
+    in_5_minute = "5"
+    in_15_minute = "15"
+    in_30_minute = "30"
+    in_45_minute = "45"
+    in_1_hour = "1H"
+    in_2_hour = "2H"
+    in_3_hour = "3H"
+    in_4_hour = "4H"
+    in_daily = "1D"
+    in_weekly = "1W"
+    in_monthly = "1M"
+
+    @classmethod
+    def custom(cls, value):
+        """Create an interval from a TradingView style resolution string
+
+        Values which are listed in this enum are returned as the enum
+        member, anything else is returned as a CustomInterval. Minutes
+        are given as a plain number, other units with a suffix: S
+        (seconds), H (hours), D (days), W (weeks), M (months).
+
+        Args:
+            value (str): resolution string, e.g. "10", "2D" or "15S"
+
+        Raises:
+            ValueError: if the value is not a valid resolution string
+
+        Returns:
+            Interval | CustomInterval: interval for the resolution
+        """
+        if isinstance(value, (cls, CustomInterval)):
+            return value
+
+        value = _normalize(value)
+        try:
+            return cls(value)
+        except ValueError:
+            return CustomInterval(value)
+
+    @property
+    def native(self):
+        return True
+
+    @property
+    def timeframe(self):
+        return _timeframe(self.value)
+
+
+class CustomInterval(object):
+    """
+    Chart interval which is not listed in the Interval enum
+
+    Instances behave like Interval members (they have value and name
+    attributes) so they can be used anywhere an Interval is accepted.
+    Resolutions which TradingView does not serve are built by
+    aggregating bars of the nearest finer native interval.
+
+    Parameters
+    ----------
+    value : str
+        resolution string, e.g. "10", "2D" or "15S"
+    """
+
+    def __init__(self, value):
+        self._value = _normalize(value)
+        self._count, self._unit = _split(self._value)
+
+    def __eq__(self, other):
+        if isinstance(other, (CustomInterval, Interval)):
+            return self.value == other.value
+
+        return False
+
+    def __hash__(self):
+        return hash(self._value)
+
+    def __repr__(self):
+        return f'Interval.custom("{self._value}")'
+
+    @property  # read-only attribute
+    def value(self):
+        return self._value
+
+    @property  # read-only attribute
+    def name(self):
+        return f"in_{self._count}_{_UNITS[self._unit][1]}"
+
+    @property
+    def native(self):
+        # True if TradingView serves this resolution directly
+        return self._value in _UPSTREAM_SECONDS
+
+    @property
+    def timeframe(self):
+        return _timeframe(self._value)
+
+    @property
+    def base(self):
+        # nearest finer native interval this interval can be built from
+        return _base(self._count, self._unit)
+
+    @property
+    def ratio(self):
+        # number of base interval bars in one bar of this interval
+        if self._unit == "M":
+            return self._count
+
+        return _seconds(self._value) // _seconds(self.base.value)
+
+
+def _split(value):
+    count, unit = _INTERVAL_RE.match(value).groups()
+    return int(count), unit
+
+
+def _normalize(value):
+    # bring resolution string into canonical form: "2h" -> "2H",
+    # "D" -> "1D", "120" -> "2H", "60S" -> "1"
+    value = str(value).strip()
+    if value[-1:] in "shdw":
+        value = value.upper()
+
+    match = _INTERVAL_RE.match(value)
+    if match is None or match.group(0) == "":
+        raise ValueError(f"not a valid interval: {value!r}")
+
+    count, unit = match.groups()
+    count = int(count) if count else 1
+    if count < 1:
+        raise ValueError(f"not a valid interval: {value!r}")
+
+    if unit == "S" and count % 60 == 0:
+        count, unit = count // 60, ""
+    if unit == "" and count % 60 == 0:
+        count, unit = count // 60, "H"
+
+    return f"{count}{unit}"
+
+
+def _seconds(value):
+    count, unit = _split(value)
+    return count * _UNITS[unit][0]
+
+
+def _base(count, unit):
+    if unit == "M":
+        return Interval.in_monthly
+    if unit == "W":
+        return Interval.in_weekly
+
+    # largest native interval (months and weeks excluded) which fits
+    # into this interval a whole number of times
+    total = count * _UNITS[unit][0]
+    natives = [CustomInterval(value) for value in _UPSTREAM_SECONDS]
+    natives += [interval for interval in Interval if interval.value[-1] not in "WM"]
+    natives = [interval for interval in natives if total % _seconds(interval.value) == 0]
+
+    return max(natives, key=lambda interval: _seconds(interval.value))
+
+
+def _timeframe(value):
+    # time period of one bar as relativedelta
+    from dateutil.relativedelta import relativedelta as rd
+
+    count, unit = _split(value)
+    if unit == "M":
+        return rd(months=count)
+    if unit == "W":
+        return rd(weeks=count)
+    if unit == "D":
+        return rd(days=count)
+
+    return rd(seconds=count * _UNITS[unit][0])
+
+
+# first Monday of the epoch, day and week groups are counted from it
+_ORIGIN = datetime.date(1970, 1, 5)
+
+# how far before a bar the session open it belongs to is looked for
+_LOOKBACK = datetime.timedelta(days=7)
+
+
+def _opens(session, first, last):
+    # epoch timestamps of session opens intraday bars from first to
+    # last epoch timestamp are anchored to, epoch if session unknown
+    if session is None:
+        return [0.0]
+
+    utc = datetime.timezone.utc
+    opens = session.opens(
+        datetime.datetime.fromtimestamp(first, utc) - _LOOKBACK, datetime.datetime.fromtimestamp(last, utc)
+    )
+    return [0.0] + [opened.timestamp() for opened in opens]
+
+
+def _calendar(session):
+    # numpy weekmask and holidays of trading days, Monday to Friday if
+    # the session is unknown
+    if session is None:
+        return "1111100", []
+
+    return session.weekmask, sorted(session.holidays)
+
+
+def _groups(unit, count, epochs, session):
+    # number of the count days, weeks or months group of each bar, days
+    # being trading days of the exchange
+    import numpy as np
+    import pandas as pd
+
+    tz = datetime.timezone.utc if session is None else session.timezone
+    local = pd.to_datetime(np.asarray(epochs, dtype=float), unit="s", utc=True).tz_convert(tz)
+    if unit == "M":
+        return (local.year * 12 + local.month - 1).to_numpy() // count
+
+    days = local.tz_localize(None).to_numpy().astype("datetime64[D]")
+    if unit == "W":
+        return (days - np.datetime64(_ORIGIN)).astype(int) // 7 // count
+
+    weekmask, holidays = _calendar(session)
+    return np.busday_count(np.datetime64(_ORIGIN), days, weekmask=weekmask, holidays=holidays) // count
+
+
+def bucket_start(interval, ts, session=None):
+    """Start of the interval bar which contains given moment
+
+    Bars are aligned the same way as by resample() so bars built
+    incrementally match the ones aggregated from history. Intraday
+    bars start at the session open, day, week and month bars on the
+    first trading day of their group at the time of day of ts.
+
+    Args:
+        interval (Interval | CustomInterval): bar interval
+        ts (float): epoch timestamp
+        session (TradingSession, optional): trading hours of the symbol,
+            bars are aligned in UTC if None
+
+    Returns:
+        float: epoch timestamp of the bar start
+    """
+    import bisect
+
+    count, unit = _split(interval.value)
+    if unit not in ("D", "W", "M"):
+        opens = _opens(session, ts, ts)
+        anchor = opens[bisect.bisect_right(opens, ts) - 1]
+        period = _seconds(interval.value)
+        return anchor + (ts - anchor) // period * period
+
+    import numpy as np
+
+    tz = datetime.timezone.utc if session is None else session.timezone
+    moment = datetime.datetime.fromtimestamp(ts, tz)
+    group = int(_groups(unit, count, [ts], session)[0])
+    if unit == "M":
+        day = datetime.date(group * count // 12, group * count % 12 + 1, 1)
+    elif unit == "W":
+        day = _ORIGIN + datetime.timedelta(weeks=group * count)
+    else:
+        weekmask, holidays = _calendar(session)
+        day = np.busday_offset(
+            np.datetime64(_ORIGIN), group * count, roll="forward", weekmask=weekmask, holidays=holidays
+        ).astype(datetime.date)
+
+    return datetime.datetime.combine(day, moment.time(), tzinfo=tz).timestamp()
+
+
+def resample(data, interval, session=None):
+    """Aggregate OHLCV bars into bars of a coarser interval
+
+    Day, week and month bars group every ratio consecutive trading
+    days, weeks or months and are labelled with their first bar.
+    Intraday bars are aligned to the session open in the exchange
+    timezone.
+
+    Args:
+        data (pd.DataFrame): bars as returned by TvDatafeed.get_hist
+        interval (Interval | CustomInterval): target interval
+        session (TradingSession, optional): trading hours of the symbol,
+            bars are aligned in UTC if None
+
+    Returns:
+        pd.DataFrame: aggregated bars with the same columns as data
+    """
+    import numpy as np
+    import pandas as pd
+
+    count, unit = _split(interval.value)
+    index = data.index
+    epochs = np.array([moment.timestamp() for moment in index.to_pydatetime()])  # index is naive local time
+    if unit in ("D", "W", "M"):
+        groups = _groups(unit, count, epochs, session)
+        starts = pd.Series(index, index=index).groupby(groups).first()
+    else:
+        opens = np.array(_opens(session, epochs.min(), epochs.max()) if len(epochs) else [0.0])
+        anchors = opens[np.searchsorted(opens, epochs, side="right") - 1]
+        period = _seconds(interval.value)
+        groups = anchors + (epochs - anchors) // period * period
+        starts = pd.Series([datetime.datetime.fromtimestamp(start) for start in np.unique(groups)])
+
+    bars = data.groupby(groups).agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    )
+    bars.index = pd.DatetimeIndex(starts.to_numpy(), name=index.name)
+    bars.insert(0, "symbol", value=data["symbol"].iloc[0])
+
+    return bars
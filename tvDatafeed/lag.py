@@ -0,0 +1,121 @@
+import collections
+import threading
+
+
+class LagPlanner(object):
+    """
+    Learned publish lag of closed bars per exchange and interval
+
+    TradingView publishes a closed bar some time after the bar has
+    ended, how long depends mostly on the exchange and the interval.
+    The planner keeps the most recent lags seen by the live feed and
+    plans when to ask for a new bar: the first attempt at the given
+    percentile of the observed lags and retries at the higher
+    percentiles, so most bars are fetched with one request shortly
+    after they become available. Until min_samples lags have been seen
+    the first attempt is made right at the bar close.
+
+    Parameters
+    ----------
+    percentile : float, optional
+        percentile of observed lags at which the first attempt is made,
+        between 0 and 1 (default 0.75)
+    window : int, optional
+        number of most recent lags kept per exchange and interval
+        (default 200)
+    min_samples : int, optional
+        lags needed before planning from them (default 5)
+    """
+
+    RETRY_PERCENTILES = (0.9, 0.99)
+
+    def __init__(self, percentile=0.75, window=200, min_samples=5):
+        if not 0 <= percentile <= 1:
+            raise ValueError("percentile must be between 0 and 1")
+
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = max(1, min_samples)
+        self._lags = {}  # (exchange, interval value) -> deque of lags in seconds
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"LagPlanner(percentile={self.percentile},keys={len(self._lags)})"
+
+    def record(self, exchange, interval, lag):
+        '''
+        Add lag between a bar close and the bar being available
+
+        Parameters
+        ----------
+        exchange : str
+            exchange of the symbol
+        interval : Interval
+            interval of the bar
+        lag : float
+            seconds from the bar close until it could be retrieved
+        '''
+        key = (exchange, interval.value)
+        with self._lock:
+            lags = self._lags.get(key)
+            if lags is None:
+                lags = self._lags[key] = collections.deque(maxlen=self.window)
+            lags.append(max(0.0, lag))
+
+    def quantile(self, exchange, interval, q):
+        '''
+        Lag not exceeded by q of the observed lags
+
+        Parameters
+        ----------
+        exchange : str
+            exchange of the symbol
+        interval : Interval
+            interval of the bar
+        q : float
+            between 0 and 1
+
+        Returns
+        -------
+        float
+            seconds, None if fewer than min_samples lags were seen
+        '''
+        with self._lock:
+            lags = sorted(self._lags.get((exchange, interval.value), ()))
+
+        if len(lags) < self.min_samples:
+            return None
+
+        return lags[min(len(lags) - 1, int(q * len(lags)))]
+
+    def schedule(self, exchange, interval):
+        '''
+        Planned attempts to fetch a closed bar
+
+        Parameters
+        ----------
+        exchange : str
+            exchange of the symbol
+        interval : Interval
+            interval of the bar
+
+        Returns
+        -------
+        list
+            increasing seconds after the bar close, the first attempt
+            followed by the planned retries. [0.0] if not enough lags
+            are known, further retries are up to the caller.
+        '''
+        with self._lock:
+            lags = sorted(self._lags.get((exchange, interval.value), ()))
+
+        if len(lags) < self.min_samples:
+            return [0.0]
+
+        attempts = []
+        for q in (self.percentile,) + self.RETRY_PERCENTILES:
+            lag = lags[min(len(lags) - 1, int(q * len(lags)))]
+            if not attempts or lag > attempts[-1]:
+                attempts.append(lag)
+
+        return attempts
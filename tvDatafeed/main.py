@@ -1,32 +1,37 @@
 import datetime
-import enum
 import json
 import logging
 import random
 import re
 import string
-import pandas as pd
-from websocket import create_connection
-import requests
+import threading
+import time
 import json
+from typing import TYPE_CHECKING
+from .interval import Interval, resample
+from .bar import Bar
+from .ratelimit import default_rate_limiter
+from .metrics import RequestTiming
+from . import tracing
+
+# pandas, requests and websocket-client are imported on first use to
+# keep "import tvDatafeed" fast
+if TYPE_CHECKING:
+    import pandas as pd
+    from .stream import QuoteStream
 
 logger = logging.getLogger(__name__)
 
 
-class Interval(enum.Enum):
-    in_1_minute = "1"
-    in_3_minute = "3"
-    in_5_minute = "5"
-    in_15_minute = "15"
-    in_30_minute = "30"
-    in_45_minute = "45"
-    in_1_hour = "1H"
-    in_2_hour = "2H"
-    in_3_hour = "3H"
-    in_4_hour = "4H"
-    in_daily = "1D"
-    in_weekly = "1W"
-    in_monthly = "1M"
+class _Flight(object):
+    # get_hist request in progress, shared with identical requests
+    __slots__ = ("n_bars", "done", "result", "error")
+
+    def __init__(self, n_bars):
+        self.n_bars = n_bars
+        self.done = threading.Event()
+        self.result = None  # only read by copying, callers get their own
+        self.error = None  # exception of the leader, raised in every caller
 
 
 class TvDatafeed:
@@ -35,33 +40,89 @@ class TvDatafeed:
     __ws_headers = json.dumps({"Origin": "https://data.tradingview.com"})
     __signin_headers = {'Referer': 'https://www.tradingview.com'}
     __ws_timeout = 5
+    __spare_ttl = 15  # seconds an idle pre-established or reused connection is trusted
 
     def __init__(
         self,
         username: str = None,
         password: str = None,
+        rate_limiter=None,
+        metrics_sink=None,
     ) -> None:
         """Create TvDatafeed object
 
+        Sign in runs in a background thread so the constructor returns
+        immediately, the first request waits for it to finish while its
+        own connection is being established.
+
         Args:
             username (str, optional): tradingview username. Defaults to None.
             password (str, optional): tradingview password. Defaults to None.
+            rate_limiter (RateLimiter, optional): budgets for connects, series creations and searches. Defaults to the process wide limiter shared by all instances.
+            metrics_sink (MetricsSink, optional): receives a RequestTiming of every upstream history request. Defaults to None.
         """
 
         self.ws_debug = False
+        self.rate_limiter = rate_limiter if rate_limiter is not None else default_rate_limiter()
+        self.metrics_sink = metrics_sink
 
-        self.token = self.__auth(username, password)
-
-        if self.token is None:
-            self.token = "unauthorized_user_token"
-            logger.warning(
-                "you are using nologin method, data you access may be limited"
+        self._token = None
+        self._auth_done = threading.Event()
+        if username is None or password is None:
+            self.__set_token(None)
+        else:
+            self._auth_thread = threading.Thread(
+                name="tvdatafeed_auth", target=self.__background_auth, args=(username, password), daemon=True
             )
+            self._auth_thread.start()
 
+        self._local = threading.local()
         self.ws = None
+        self._spare = []  # pre-established (created, websocket) pairs
+        self._spare_lock = threading.Lock()
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._symbol_info = {}  # EXCHANGE:SYMBOL -> symbol_resolved metadata of the last request
         self.session = self.__generate_session()
         self.chart_session = self.__generate_chart_session()
 
+    @property
+    def ws(self):
+        # websocket is kept per thread so that concurrent get_hist calls
+        # from several threads each use their own connection
+        return getattr(self._local, "ws", None)
+
+    @ws.setter
+    def ws(self, value):
+        self._local.ws = value
+
+    @property
+    def token(self):
+        # blocks until background sign in has finished
+        self._auth_done.wait()
+        return self._token
+
+    @token.setter
+    def token(self, value):
+        self._token = value
+        self._auth_done.set()
+
+    def __set_token(self, token):
+        if token is None:
+            token = "unauthorized_user_token"
+            logger.warning(
+                "you are using nologin method, data you access may be limited"
+            )
+
+        self.token = token
+
+    def __background_auth(self, username, password):
+        token = None
+        try:
+            token = self.__auth(username, password)
+        finally:  # never leave requests waiting for the token
+            self.__set_token(token)
+
     def __auth(self, username, password):
 
         if (username is None or password is None):
@@ -72,6 +133,8 @@ class TvDatafeed:
                     "password": password,
                     "remember": "on"}
             try:
+                import requests
+
                 response = requests.post(
                     url=self.__sign_in_url, data=data, headers=self.__signin_headers)
                 token = response.json()['user']['auth_token']
@@ -81,11 +144,107 @@ class TvDatafeed:
 
         return token
 
-    def __create_connection(self):
+    def _open_connection(self):
+        # open a new websocket to TradingView data server
+        from websocket import create_connection
+
         logging.debug("creating websocket connection")
-        self.ws = create_connection(
-            "wss://data.tradingview.com/socket.io/websocket", headers=self.__ws_headers, timeout=self.__ws_timeout
-        )
+        self.rate_limiter.acquire("connect")
+        with tracing.span("tvdatafeed.connect"):
+            return create_connection(
+                "wss://data.tradingview.com/socket.io/websocket", headers=self.__ws_headers, timeout=self.__ws_timeout
+            )
+
+    def __add_spare(self):
+        # open a connection in advance for a later request
+        try:
+            ws = self._open_connection()
+        except Exception as e:
+            logger.error(f"warmup connection failed: {e}")
+            return
+
+        with self._spare_lock:
+            self._spare.append((time.monotonic(), ws))
+
+    def __take_spare(self):
+        # return a pre-established connection which is fresh enough,
+        # idle ones may have been dropped by the server meanwhile
+        while True:
+            with self._spare_lock:
+                if not self._spare:
+                    return None
+                created, ws = self._spare.pop()
+
+            if time.monotonic() - created < self.__spare_ttl:
+                return ws
+
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def __create_connection(self):
+        # reuse the connection of this thread with its chart and quote
+        # sessions if it was used recently, otherwise open a new one.
+        # Returns True if the connection is reused
+        if self.ws is not None:
+            if time.monotonic() - self._local.used < self.__spare_ttl:
+                return True
+            self.__drop_connection()
+
+        ws = self.__take_spare()
+        self.ws = ws if ws is not None else self._open_connection()
+        self._local.used = time.monotonic()
+        self._local.requests = 0
+        self._local.symbol = None
+
+        return False
+
+    def __drop_connection(self):
+        # close the connection of this thread, the next request opens a
+        # new one
+        ws, self.ws = self.ws, None
+        if ws is None:
+            return
+
+        try:
+            ws.close()
+        except Exception:
+            pass
+
+    def warmup(self, connections: int = 1, timeout: float = None) -> bool:
+        """Prepare for upcoming requests
+
+        Finishes sign in, loads pandas and opens connections in advance
+        so the next requests skip DNS resolution, TLS handshake and
+        websocket upgrade. Pre-established connections are only used
+        if a request comes within a few seconds, call this shortly
+        before the requests are expected (e.g. before market open).
+
+        Args:
+            connections (int, optional): number of connections to open in parallel. Defaults to 1.
+            timeout (float, optional): maximum time to wait in seconds. Defaults to None (blocking).
+
+        Returns:
+            bool: True if everything was ready within timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        threads = [
+            threading.Thread(name="tvdatafeed_warmup", target=self.__add_spare, daemon=True)
+            for _ in range(connections)
+        ]
+        for thread in threads:
+            thread.start()
+
+        import pandas  # noqa: F401, first DataFrame would pay for it otherwise
+
+        def remaining():
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        for thread in threads:
+            thread.join(remaining())
+
+        return self._auth_done.wait(remaining()) and not any(thread.is_alive() for thread in threads)
 
     @staticmethod
     def __filter_raw_message(text):
@@ -132,6 +291,8 @@ class TvDatafeed:
 
     @staticmethod
     def __create_df(raw_data, symbol):
+        import pandas as pd
+
         try:
             out = re.search('"s":\[(.+?)\}\]', raw_data).group(1)
             x = out.split(',{"')
@@ -169,6 +330,28 @@ class TvDatafeed:
         except AttributeError:
             logger.error("no data, please check the exchange and symbol")
 
+    @staticmethod
+    def __parse_bars(raw_data):
+        # bars of a series reply as Bar tuples, without pandas
+        match = re.search(r'"s":\[(.+?)\}\]', raw_data)
+        if match is None:
+            logger.error("no data, please check the exchange and symbol")
+            return None
+
+        bars = []
+        for xi in match.group(1).split(',{"'):
+            xi = re.split(r"\[|:|,|\]", xi)
+            values = []
+            for value in xi[5:10]:
+                try:
+                    values.append(float(value))
+                except ValueError:  # no volume data
+                    values.append(0.0)
+            values += [0.0] * (5 - len(values))
+            bars.append(Bar(int(float(xi[4])), *values))
+
+        return bars
+
     @staticmethod
     def __format_symbol(symbol, exchange, contract: int = None):
 
@@ -193,13 +376,19 @@ class TvDatafeed:
         n_bars: int = 10,
         fut_contract: int = None,
         extended_session: bool = False,
-    ) -> pd.DataFrame:
+    ) -> "pd.DataFrame":
         """get historical data
 
+        Intervals which TradingView does not serve (see Interval.custom)
+        are built locally by aggregating bars of the nearest finer native
+        interval. Concurrent calls for the same symbol, interval and session
+        share one upstream request; callers other than the first one get a
+        copy of the result.
+
         Args:
             symbol (str): symbol name
             exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
-            interval (str, optional): chart interval. Defaults to 'D'.
+            interval (Interval | str, optional): chart interval or resolution string like "10" or "2D". Defaults to 'D'.
             n_bars (int, optional): no of bars to download, max 5000. Defaults to 10.
             fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
             extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
@@ -211,13 +400,162 @@ class TvDatafeed:
             symbol=symbol, exchange=exchange, contract=fut_contract
         )
 
-        interval = interval.value
+        interval = Interval.custom(interval)
+
+        with tracing.span("tvdatafeed.get_hist", symbol=symbol, exchange=symbol.split(":")[0],
+                          interval=interval.value, n_bars=n_bars):
+            return self.__coalesced_hist(symbol, interval, n_bars, extended_session)
+
+    def get_bars(
+        self,
+        symbol: str,
+        exchange: str = "NSE",
+        interval: Interval = Interval.in_daily,
+        n_bars: int = 10,
+        fut_contract: int = None,
+        extended_session: bool = False,
+    ) -> list:
+        """get historical data as Bar tuples
+
+        Same as get_hist but the reply of native intervals is parsed
+        straight into Bar tuples without building a DataFrame, which is
+        much cheaper for a few bars. Custom intervals are aggregated by
+        get_hist and converted.
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to None.
+            interval (Interval | str, optional): chart interval or resolution string like "10" or "2D". Defaults to 'D'.
+            n_bars (int, optional): no of bars to download, max 5000. Defaults to 10.
+            fut_contract (int, optional): None for cash, 1 for continuous current contract in front, 2 for continuous next contract in front . Defaults to None.
+            extended_session (bool, optional): regular session if False, extended session if True, Defaults to False.
+
+        Returns:
+            list: Bar tuples, oldest first. None if no data was received.
+        """
+        interval = Interval.custom(interval)
+        if not interval.native:
+            data = self.get_hist(symbol, exchange, interval, n_bars, fut_contract, extended_session)
+            if data is None:
+                return None
+            return [
+                Bar(int(ts.to_pydatetime().timestamp()), row.open, row.high, row.low, row.close, row.volume)
+                for ts, row in zip(data.index, data.itertuples())
+            ]
+
+        symbol = self.__format_symbol(
+            symbol=symbol, exchange=exchange, contract=fut_contract
+        )
+
+        with tracing.span("tvdatafeed.get_bars", symbol=symbol, exchange=symbol.split(":")[0],
+                          interval=interval.value, n_bars=n_bars):
+            raw_data, timing = self.__fetch_raw(symbol, interval.value, n_bars, extended_session)
+            bars = self.__parse_bars(raw_data)
+            self.__record_timing(timing, bars is not None)
+
+        return bars
+
+    def __coalesced_hist(self, symbol, interval, n_bars, extended_session):
+        # identical concurrent requests share one upstream fetch, requests
+        # for fewer bars are served from a larger one already in flight.
+        # Futures contract is part of the formatted symbol
+        key = (symbol, interval.value, extended_session)
+        with self._flights_lock:
+            flights = self._flights.setdefault(key, [])
+            for flight in flights:
+                if flight.n_bars >= n_bars:
+                    break
+            else:
+                flight = None
+                leader = _Flight(n_bars)
+                flights.append(leader)
+
+        if flight is not None:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if flight.result is None:
+                return None
+            return flight.result.iloc[-n_bars:].copy()
+
+        try:
+            leader.result = self.__load_hist(symbol, interval, n_bars, extended_session)
+        except Exception as e:
+            leader.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                flights.remove(leader)
+                if not flights:
+                    del self._flights[key]
+            leader.done.set()
+
+        return None if leader.result is None else leader.result.copy()
+
+    def __load_hist(self, symbol, interval, n_bars, extended_session):
+        # fetch native intervals directly, aggregate custom ones from
+        # their base interval
+        if interval.native:
+            return self.__fetch_hist(symbol, interval.value, n_bars, extended_session)
+
+        # one extra bar group in case the oldest one is incomplete
+        data = self.__fetch_hist(
+            symbol, interval.base.value, (n_bars + 1) * interval.ratio, extended_session
+        )
+        if data is None:
+            return None
+
+        return resample(data, interval, self.get_session(symbol)).iloc[-n_bars:]
+
+    def __handshake(self, symbol, interval, n_bars, extended_session, timing, reused):
+        # authenticate and create chart and quote sessions on a fresh
+        # connection, replace the series of the last request on a
+        # reused one, then request n_bars of interval for symbol
+        local = self._local
+        if reused:
+            self.__send_message("remove_series", [self.chart_session, "s1"])
+            if local.symbol != symbol:
+                self.__send_message("quote_remove_symbols", [self.session, local.symbol])
+        else:
+            self.__send_message("set_auth_token", [self.token])
+            self.__send_message("chart_create_session", [self.chart_session, ""])
+            self.__send_message("quote_create_session", [self.session])
+            self.__send_quote_fields()
+
+        if local.symbol != symbol:
+            self.__send_message(
+                "quote_add_symbols", [self.session, symbol,
+                                      {"flags": ["force_permission"]}]
+            )
+            self.__send_message("quote_fast_symbols", [self.session, symbol])
+            local.symbol = symbol
+        if timing is not None:
+            timing.phase("auth")
 
-        self.__create_connection()
+        local.requests += 1
+        symbol_id = f"symbol_{local.requests}"  # resolved symbols stay in the chart session
+        self.__send_message(
+            "resolve_symbol",
+            [
+                self.chart_session,
+                symbol_id,
+                '={"symbol":"'
+                + symbol
+                + '","adjustment":"splits","session":'
+                + ('"regular"' if not extended_session else '"extended"')
+                + "}",
+            ],
+        )
+        self.rate_limiter.acquire("series")
+        self.__send_message(
+            "create_series",
+            [self.chart_session, "s1", "s1", symbol_id, interval, n_bars],
+        )
+        if not reused:
+            self.__send_message("switch_timezone", [
+                                self.chart_session, "exchange"])
 
-        self.__send_message("set_auth_token", [self.token])
-        self.__send_message("chart_create_session", [self.chart_session, ""])
-        self.__send_message("quote_create_session", [self.session])
+    def __send_quote_fields(self):
         self.__send_message(
             "quote_set_fields",
             [
@@ -248,30 +586,36 @@ class TvDatafeed:
             ],
         )
 
-        self.__send_message(
-            "quote_add_symbols", [self.session, symbol,
-                                  {"flags": ["force_permission"]}]
-        )
-        self.__send_message("quote_fast_symbols", [self.session, symbol])
+    def __fetch_hist(self, symbol, interval, n_bars, extended_session):
+        # request n_bars of native resolution interval for already
+        # formatted symbol and parse the reply into a DataFrame
+        raw_data, timing = self.__fetch_raw(symbol, interval, n_bars, extended_session)
+        data = self.__create_df(raw_data, symbol)
+        self.__record_timing(timing, data is not None)
 
-        self.__send_message(
-            "resolve_symbol",
-            [
-                self.chart_session,
-                "symbol_1",
-                '={"symbol":"'
-                + symbol
-                + '","adjustment":"splits","session":'
-                + ('"regular"' if not extended_session else '"extended"')
-                + "}",
-            ],
-        )
-        self.__send_message(
-            "create_series",
-            [self.chart_session, "s1", "s1", "symbol_1", interval, n_bars],
-        )
-        self.__send_message("switch_timezone", [
-                            self.chart_session, "exchange"])
+        return data
+
+    def __fetch_raw(self, symbol, interval, n_bars, extended_session):
+        # request n_bars of native resolution interval for already
+        # formatted symbol, return the raw reply and its timing. The
+        # connection of this thread is kept for the next request, a
+        # reused one which fails is replaced once by a new connection
+        sink = self.metrics_sink
+        timing = None if sink is None else RequestTiming(symbol, interval, n_bars)
+
+        reused = self.__create_connection()
+        if timing is not None:
+            timing.phase("connect")
+
+        try:
+            with tracing.span("tvdatafeed.handshake", symbol=symbol, interval=interval, n_bars=n_bars):
+                self.__handshake(symbol, interval, n_bars, extended_session, timing, reused)
+        except Exception as e:
+            self.__drop_connection()
+            if not reused:
+                raise
+            logger.debug(f"reused connection failed, reconnecting: {e}")
+            return self.__fetch_raw(symbol, interval, n_bars, extended_session)
 
         raw_data = ""
 
@@ -279,21 +623,116 @@ class TvDatafeed:
         while True:
             try:
                 result = self.ws.recv()
-                raw_data = raw_data + result + "\n"
+                if "~h~" in result or '"du"' in result:
+                    result = self.__filter_stale(result)
             except Exception as e:
+                self.__drop_connection()
+                if reused and not raw_data:
+                    logger.debug(f"reused connection failed, reconnecting: {e}")
+                    return self.__fetch_raw(symbol, interval, n_bars, extended_session)
                 logger.error(e)
                 break
 
+            raw_data = raw_data + result + "\n"
+            if timing is not None:
+                timing.on_message(result)
+
+            if "symbol_resolved" in result:
+                self.__keep_symbol_info(symbol, result)
+
             if "series_completed" in result:
+                self._local.used = time.monotonic()
                 break
 
-        return self.__create_df(raw_data, symbol)
+        return raw_data, timing
+
+    def __filter_stale(self, message):
+        # answer heartbeats and drop bar updates of series from earlier
+        # requests on a reused connection
+        from .stream import decode
+
+        kept = []
+        for payload in decode(message):
+            if payload.startswith("~h~"):
+                self.ws.send(self.__prepend_header(payload))
+            elif '"m":"du"' not in payload:
+                kept.append(self.__prepend_header(payload))
+
+        return "".join(kept)
+
+    def __record_timing(self, timing, ok):
+        # close the parse phase and pass the timing to the metrics sink
+        if timing is None:
+            return
+
+        timing.phase("parse")
+        timing.finish(ok)
+        try:
+            self.metrics_sink.record(timing)
+        except Exception as e:
+            logger.error(f"metrics sink failed: {e}")
+
+    def __keep_symbol_info(self, symbol, message):
+        # remember metadata (session, timezone, ...) of resolved symbol
+        from .stream import decode
+
+        for payload in decode(message):
+            if '"symbol_resolved"' in payload:
+                try:
+                    self._symbol_info[symbol] = json.loads(payload)["p"][2]
+                except (ValueError, KeyError, IndexError) as e:
+                    logger.debug(f"unreadable symbol metadata: {e}")
+
+    def symbol_info(self, symbol: str, exchange: str = "NSE"):
+        """Metadata of a symbol seen in the last request for it
+
+        TradingView sends symbol metadata such as description, session,
+        timezone and session_holidays with every history request, the
+        last one received for each symbol is kept.
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to "NSE".
+
+        Returns:
+            dict: metadata, None if the symbol has not been requested yet
+        """
+        if ":" not in symbol:
+            symbol = f"{exchange}:{symbol}"
+
+        return self._symbol_info.get(symbol)
+
+    def get_session(self, symbol: str, exchange: str = "NSE"):
+        """Trading hours of a symbol
+
+        Taken from the symbol metadata of the last request, or from the
+        local calendar table (tvDatafeed.session.CALENDARS) when the
+        symbol has not been requested yet.
+
+        Args:
+            symbol (str): symbol name
+            exchange (str, optional): exchange, not required if symbol is in format EXCHANGE:SYMBOL. Defaults to "NSE".
+
+        Returns:
+            TradingSession: trading hours, None if unknown
+        """
+        from .session import from_symbol_info, from_calendar
+
+        info = self.symbol_info(symbol, exchange)
+        session = from_symbol_info(info) if info is not None else None
+        if session is None:
+            session = from_calendar(symbol.split(":")[0] if ":" in symbol else exchange)
+
+        return session
 
     def search_symbol(self, text: str, exchange: str = ''):
         url = self.__search_url.format(text, exchange)
 
         symbols_list = []
         try:
+            import requests
+
+            self.rate_limiter.acquire("search")
             resp = requests.get(url)
 
             symbols_list = json.loads(resp.text.replace(
@@ -303,6 +742,24 @@ class TvDatafeed:
 
         return symbols_list
 
+    def stream_quotes(self, fields=None) -> "QuoteStream":
+        """Create a real-time quote stream
+
+        All symbols subscribed on the returned stream share one
+        websocket and one quote session, callbacks receive only the
+        fields that changed. See QuoteStream.subscribe.
+
+        Args:
+            fields (list, optional): quote fields to stream, such as
+                "lp", "volume" or "bid". Defaults to QuoteStream.FIELDS.
+
+        Returns:
+            QuoteStream: stream, started on first subscription
+        """
+        from .stream import QuoteStream
+
+        return QuoteStream(self, fields)
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.DEBUG)
@@ -0,0 +1,225 @@
+import logging
+import threading
+import time
+
+
+class RequestTiming(object):
+    """
+    Timing breakdown of a single get_hist request
+
+    All phase durations are in seconds, a phase which was not reached
+    (for example because the connection failed) stays None.
+
+    Attributes
+    ----------
+    symbol : str
+        formatted symbol, EXCHANGE:SYMBOL
+    interval : str
+        native resolution requested from TradingView
+    n_bars : int
+        number of bars requested
+    connect : float
+        websocket connect including DNS, TCP, TLS and the rate limiter wait
+    auth : float
+        sending auth token and creating the chart and quote sessions
+    resolve_symbol : float
+        from resolve_symbol request until symbol_resolved reply
+    first_data : float
+        from end of symbol resolution until the first timescale_update
+    remaining : float
+        from first timescale_update until series_completed
+    parse : float
+        building the DataFrame
+    total : float
+        whole request
+    bytes_received : int
+        size of all received websocket messages
+    frames : int
+        number of received protocol frames
+    ok : bool
+        True if a DataFrame was returned
+    """
+
+    PHASES = ("connect", "auth", "resolve_symbol", "first_data", "remaining", "parse")
+
+    __slots__ = ("symbol", "interval", "n_bars", "connect", "auth", "resolve_symbol", "first_data",
+                 "remaining", "parse", "total", "bytes_received", "frames", "ok",
+                 "_started", "_mark")
+
+    def __init__(self, symbol, interval, n_bars):
+        self.symbol = symbol
+        self.interval = interval
+        self.n_bars = n_bars
+        self.connect = self.auth = self.resolve_symbol = None
+        self.first_data = self.remaining = self.parse = None
+        self.total = None
+        self.bytes_received = 0
+        self.frames = 0
+        self.ok = False
+
+        self._started = self._mark = time.perf_counter()
+
+    def __repr__(self):
+        return "RequestTiming(" + ",".join(f"{key}={value!r}" for key, value in self.as_dict().items()) + ")"
+
+    def phase(self, name):
+        # close phase name at current time and start the next one
+        now = time.perf_counter()
+        setattr(self, name, now - self._mark)
+        self._mark = now
+
+    def on_message(self, message):
+        # account received websocket message and close the protocol
+        # phases it completes
+        self.bytes_received += len(message)
+        self.frames += message.count("~m~") // 2
+
+        if self.resolve_symbol is None:
+            if "symbol_resolved" in message:
+                self.phase("resolve_symbol")
+            else:
+                return
+        if self.first_data is None:
+            if "timescale_update" in message:
+                self.phase("first_data")
+            else:
+                return
+        if "series_completed" in message:
+            self.phase("remaining")
+
+    def finish(self, ok):
+        self.ok = ok
+        self.total = time.perf_counter() - self._started
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__ if not key.startswith("_")}
+
+
+class MetricsSink(object):
+    """
+    Base class of receivers of RequestTiming records
+
+    Subclasses implement record(). Sinks are called from the thread
+    which made the request so they must be thread safe.
+    """
+
+    def record(self, timing):
+        raise NotImplementedError
+
+
+class CallbackSink(MetricsSink):
+    """
+    Pass every RequestTiming to a function
+
+    Parameters
+    ----------
+    callback : func
+        function with prototype func_name(timing)
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def record(self, timing):
+        self.callback(timing)
+
+
+class LoggingSink(MetricsSink):
+    """
+    Log every RequestTiming with phases attached as extra fields
+
+    The record gets a tv_timing attribute holding RequestTiming.as_dict()
+    which structured log formatters can emit as fields.
+
+    Parameters
+    ----------
+    logger : logging.Logger, optional
+        logger to use, defaults to tvDatafeed.metrics logger
+    level : int, optional
+        log level (default logging.INFO)
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger if logger is not None else logging.getLogger(__name__)
+        self.level = level
+
+    def record(self, timing):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(
+                self.level,
+                "get_hist %s %s n_bars=%s took %.3fs",
+                timing.symbol, timing.interval, timing.n_bars, timing.total,
+                extra={"tv_timing": timing.as_dict()},
+            )
+
+
+class MetricsRegistry(MetricsSink):
+    """
+    Prometheus style registry of request metrics
+
+    Keeps a request counter by status, byte and frame counters and a
+    duration histogram for every phase. render() returns the metrics in
+    Prometheus text exposition format, ready to be served by an HTTP
+    endpoint or written for the node exporter textfile collector.
+
+    Parameters
+    ----------
+    prefix : str, optional
+        metric name prefix (default "tvdatafeed")
+    buckets : tuple, optional
+        histogram bucket upper bounds in seconds
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, prefix="tvdatafeed", buckets=BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+
+        self._lock = threading.Lock()
+        self._requests = {"ok": 0, "error": 0}
+        self._bytes = 0
+        self._frames = 0
+        phases = RequestTiming.PHASES + ("total",)
+        # phase -> [bucket counts..., +Inf count, sum]
+        self._histograms = {phase: [0] * (len(self.buckets) + 1) + [0.0] for phase in phases}
+
+    def record(self, timing):
+        with self._lock:
+            self._requests["ok" if timing.ok else "error"] += 1
+            self._bytes += timing.bytes_received
+            self._frames += timing.frames
+            for phase, histogram in self._histograms.items():
+                value = getattr(timing, phase)
+                if value is None:
+                    continue
+                for i, bound in enumerate(self.buckets):
+                    if value <= bound:
+                        histogram[i] += 1
+                histogram[-2] += 1
+                histogram[-1] += value
+
+    def render(self):
+        '''
+        Return metrics in Prometheus text exposition format
+
+        Returns
+        -------
+        str
+            metrics text
+        '''
+        p = self.prefix
+        with self._lock:
+            lines = [f"# TYPE {p}_requests_total counter"]
+            lines += [f'{p}_requests_total{{status="{status}"}} {count}' for status, count in self._requests.items()]
+            lines += [f"# TYPE {p}_received_bytes_total counter", f"{p}_received_bytes_total {self._bytes}"]
+            lines += [f"# TYPE {p}_received_frames_total counter", f"{p}_received_frames_total {self._frames}"]
+            lines += [f"# TYPE {p}_request_phase_seconds histogram"]
+            for phase, histogram in self._histograms.items():
+                for bound, count in zip(self.buckets, histogram):
+                    lines.append(f'{p}_request_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {count}')
+                lines.append(f'{p}_request_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {histogram[-2]}')
+                lines.append(f'{p}_request_phase_seconds_count{{phase="{phase}"}} {histogram[-2]}')
+                lines.append(f'{p}_request_phase_seconds_sum{{phase="{phase}"}} {histogram[-1]}')
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class TokenBucket(object):
+    """
+    Thread safe token bucket
+
+    Tokens are refilled continuously at rate per second up to burst
+    tokens. Callers take tokens with acquire() which blocks until
+    enough tokens are available.
+
+    Parameters
+    ----------
+    rate : float
+        tokens added per second
+    burst : float, optional
+        bucket capacity, defaults to max(1, rate)
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+
+    def _take(self, tokens):
+        # take tokens if available and return 0, otherwise return the
+        # number of seconds after which they will be available
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, timeout=None):
+        '''
+        Take tokens from bucket, wait until they are available
+
+        Parameters
+        ----------
+        tokens : float, optional
+            number of tokens to take (default 1)
+        timeout : float, optional
+            maximum time to wait in seconds, default is None (blocking)
+
+        Returns
+        -------
+        boolean
+            True if tokens were taken, False if timed out
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while (wait := self._take(tokens)) > 0:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining < wait:
+                    return False
+            time.sleep(wait)
+
+        return True
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket with its state kept in a file
+
+    All processes (and threads) that use the same path share one
+    bucket. State updates are serialized with an exclusive file lock.
+    Placing the file on a memory backed file system such as /dev/shm
+    avoids disk access.
+
+    Parameters
+    ----------
+    path : str
+        file holding bucket state, created if it does not exist
+    rate : float
+        tokens added per second
+    burst : float, optional
+        bucket capacity, defaults to max(1, rate)
+    """
+
+    def __init__(self, path, rate, burst=None):
+        super().__init__(rate, burst)
+        self.path = path
+
+        with open(self.path, "a"):  # make sure the file exists
+            pass
+
+    def _take(self, tokens):
+        with self._lock, open(self.path, "r+") as fh:
+            _lock_file(fh)
+            try:
+                try:
+                    state = json.loads(fh.read())
+                    available, stamp = state["tokens"], state["stamp"]
+                except (ValueError, KeyError):  # new or corrupted file
+                    available, stamp = self.burst, time.time()
+
+                # wall clock is the only clock shared between processes,
+                # ignore backward jumps
+                now = time.time()
+                available = min(self.burst, available + max(0.0, now - stamp) * self.rate)
+
+                if available >= tokens:
+                    available -= tokens
+                    wait = 0.0
+                else:
+                    wait = (tokens - available) / self.rate
+
+                fh.seek(0)
+                fh.truncate()
+                fh.write(json.dumps({"tokens": available, "stamp": now}))
+                fh.flush()
+            finally:
+                _unlock_file(fh)
+
+        return wait
+
+
+def _lock_file(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class RateLimiter(object):
+    """
+    Separate request budgets for connects, series creations and searches
+
+    Every upstream request of TvDatafeed and TvDatafeedLive takes a
+    token from the budget of its kind before it is sent, so callers are
+    paced to the configured rates instead of being throttled by the
+    server. By default the budgets are shared by threads of this
+    process only; if path is given they are kept in files in that
+    directory and shared by every process using the same directory.
+
+    Parameters
+    ----------
+    connect : tuple, optional
+        (rate, burst) of websocket connects (default (5, 20))
+    series : tuple, optional
+        (rate, burst) of chart series creations (default (10, 40))
+    search : tuple, optional
+        (rate, burst) of symbol searches (default (2, 10))
+    path : str, optional
+        directory for cross-process shared budgets (default None)
+    """
+
+    KINDS = ("connect", "series", "search")
+
+    def __init__(self, connect=(5, 20), series=(10, 40), search=(2, 10), path=None):
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+        self._buckets = {}
+        for kind, (rate, burst) in zip(self.KINDS, (connect, series, search)):
+            if path is None:
+                self._buckets[kind] = TokenBucket(rate, burst)
+            else:
+                self._buckets[kind] = FileTokenBucket(os.path.join(path, kind + ".bucket"), rate, burst)
+
+    def acquire(self, kind, timeout=None):
+        '''
+        Take one token from the budget of given kind
+
+        Parameters
+        ----------
+        kind : str
+            one of "connect", "series" or "search"
+        timeout : float, optional
+            maximum time to wait in seconds, default is None (blocking)
+
+        Returns
+        -------
+        boolean
+            True if allowed to proceed, False if timed out
+        '''
+        return self._buckets[kind].acquire(timeout=timeout)
+
+
+_default_limiter = None
+_default_lock = threading.Lock()
+
+
+def default_rate_limiter():
+    """Return the process wide rate limiter shared by all instances
+
+    Returns:
+        RateLimiter: limiter created with default budgets on first call
+    """
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter()
+
+    return _default_limiter
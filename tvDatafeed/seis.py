@@ -1,4 +1,5 @@
 import tvDatafeed
+from tvDatafeed.ticks import BarRule
 
 class Seis(object):
     """
@@ -39,7 +40,7 @@ class Seis(object):
         
         self._tvdatafeed=None 
         self._consumers=[]
-        self._updated=None # datetime of the data bar that was last retrieved from TradingView
+        self._updated=None # epoch timestamp of the data bar that was last retrieved from TradingView
     
     def __eq__(self, other):
         # Compare two seis instances to decide if they are equal
@@ -53,6 +54,10 @@ class Seis(object):
         
         return False
     
+    def __hash__(self):
+        # consistent with __eq__, symbol, exchange and interval never change
+        return hash((self._symbol, self._exchange, self._interval.value))
+    
     def __repr__(self):
         return f'Seis("{self._symbol}","{self._exchange}",{self._interval})'
     
@@ -88,17 +93,37 @@ class Seis(object):
     def tvdatafeed(self):
         self._tvdatafeed=None
     
-    def new_consumer(self, callback, timeout=-1):
+    def new_consumer(self, callback, timeout=-1, pooled=None, capacity=None, policy="block", loop=None, concurrency=1, as_frame=False):
         '''
         Create a new consumer and add to Seis
         
         Parameters
         ----------
-        callback : func
-            function to call when new data produced
+        callback : func or coroutine function
+            function to call when new data produced, a coroutine 
+            function is run as tasks on the event loop
         timeout : int, optional
             maximum time to wait in seconds for return, default
             is -1 (blocking)
+        pooled : bool, optional
+            run the callback on the shared consumer pool of 
+            TvDatafeedLive instead of a thread of its own
+        capacity : int, optional
+            maximum number of bars waiting for the callback, default
+            is no limit
+        policy : str, optional
+            "block", "drop_oldest", "drop_newest" or "latest", what to
+            do with a new bar when capacity bars are waiting (default
+            "block")
+        loop : asyncio.AbstractEventLoop, optional
+            event loop for a coroutine function callback, default is
+            the running loop of the calling thread
+        concurrency : int, optional
+            maximum number of tasks of a coroutine function callback
+            running at the same time, None for no limit (default 1)
+        as_frame : bool, optional
+            pass bars as one-row DataFrames instead of Bar tuples 
+            (default False)
         
         Returns
         -------
@@ -114,7 +139,7 @@ class Seis(object):
         if self._tvdatafeed is None:
             raise NameError("TvDatafeed not provided")
         
-        return self._tvdatafeed.new_consumer(self, callback, timeout) # methods go through tvdatafeed to acquire lock and make it thread safe
+        return self._tvdatafeed.new_consumer(self, callback, timeout, pooled, capacity, policy, loop, concurrency, as_frame) # methods go through tvdatafeed to acquire lock and make it thread safe
     
     def del_consumer(self, consumer, timeout=-1):
         '''
@@ -154,7 +179,7 @@ class Seis(object):
         # ----------
         # consumer : tvdatafeed.Consumer
         #     consumer instance
-        self._consumers.append(consumer)
+        self._consumers=self._consumers+[consumer] # copy on write, lists already returned stay unchanged
         
     def pop_consumer(self, consumer):
         # Remove consumer from Seis, not for direct use
@@ -169,7 +194,7 @@ class Seis(object):
         #    consumer instance
         if consumer not in self._consumers:
             raise NameError("Consumer does not exist in the list")
-        self._consumers.remove(consumer)
+        self._consumers=[item for item in self._consumers if item is not consumer] # copy on write
     
     def is_new_data(self, data):
         ''''
@@ -177,7 +202,7 @@ class Seis(object):
         
         Parameters
         ----------
-        data : pandas.DataFrame
+        data : Bar or pandas.DataFrame
             contains retrieved data and datetime
         
         Returns
@@ -185,8 +210,9 @@ class Seis(object):
         boolean
             True is new, False otherwise
         '''
-        if self._updated != data.index.to_pydatetime()[0]: 
-            self._updated=data.index.to_pydatetime()[0] # update the datetime of the last sample
+        updated=data.time if isinstance(data, tvDatafeed.Bar) else int(data.index[0].to_pydatetime().timestamp())
+        if self._updated != updated: 
+            self._updated=updated # update the timestamp of the last sample
             return True
         
         return False
@@ -215,9 +241,14 @@ class Seis(object):
         ------
         NameError
             if no TvDatafeedLive reference is added for this Seis
+        ValueError
+            if bars of this Seis are built from ticks, TradingView has
+            no history for them
         '''
         if self._tvdatafeed is None:
             raise NameError("TvDatafeed not provided")
+        if isinstance(self._interval, BarRule):
+            raise ValueError(f"no history for bars built from ticks ({self._interval.value}), use a tvDatafeed.Interval Seis")
         
         return self._tvdatafeed.get_hist(symbol=self._symbol, exchange=self._exchange, interval=self._interval, n_bars=n_bars, timeout=timeout) 
     
@@ -250,7 +281,8 @@ class Seis(object):
         -------
         list
             contains all consumer instances registered 
-            for this Seis
+            for this Seis, the list is a snapshot which is 
+            not changed when consumers are added or removed
         '''
         return self._consumers
     
\ No newline at end of file
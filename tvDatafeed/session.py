@@ -0,0 +1,242 @@
+import datetime
+import functools
+import re
+
+# regular sessions of common exchanges, used until TradingView symbol
+# metadata has been seen for a symbol: exchange -> (session, timezone)
+CALENDARS = {
+    "NYSE": ("0930-1600", "America/New_York"),
+    "NASDAQ": ("0930-1600", "America/New_York"),
+    "AMEX": ("0930-1600", "America/New_York"),
+    "NYSE ARCA": ("0930-1600", "America/New_York"),
+    "TSX": ("0930-1600", "America/Toronto"),
+    "LSE": ("0800-1630", "Europe/London"),
+    "XETR": ("0900-1730", "Europe/Berlin"),
+    "EURONEXT": ("0900-1730", "Europe/Paris"),
+    "SIX": ("0900-1730", "Europe/Zurich"),
+    "NSE": ("0915-1530", "Asia/Kolkata"),
+    "BSE": ("0915-1530", "Asia/Kolkata"),
+    "TSE": ("0900-1130,1230-1530", "Asia/Tokyo"),
+    "HKEX": ("0930-1200,1300-1600", "Asia/Hong_Kong"),
+    "ASX": ("1000-1600", "Australia/Sydney"),
+    "BINANCE": ("24x7", "Etc/UTC"),
+    "COINBASE": ("24x7", "Etc/UTC"),
+    "BITSTAMP": ("24x7", "Etc/UTC"),
+    "KRAKEN": ("24x7", "Etc/UTC"),
+    "BYBIT": ("24x7", "Etc/UTC"),
+}
+
+_RANGE_RE = re.compile(r"^(\d{4})-(\d{4})(?::([1-7]+))?$")
+
+# days a session without day list trades on, TradingView numbers
+# days from 1 (Sunday) to 7 (Saturday)
+_WEEKDAYS = "23456"
+
+# how far ahead next_open looks for an open session
+_HORIZON_DAYS = 30
+
+
+class TradingSession(object):
+    """
+    Trading hours of a symbol in the exchange timezone
+
+    Parses TradingView session strings as found in symbol metadata:
+    comma or pipe separated ranges "HHMM-HHMM" optionally followed by
+    ":" and the trading days (1 Sunday ... 7 Saturday), Monday to
+    Friday if omitted. A range which ends before it starts begins on
+    the previous day, one which ends when it starts ("0000-0000") lasts
+    the whole day and "24x7" trades all the time.
+
+    Parameters
+    ----------
+    session : str
+        session string, e.g. "0930-1600" or "1800-1700:23456"
+    timezone : str
+        IANA timezone of the exchange, e.g. "America/New_York"
+    holidays : str, optional
+        comma separated YYYYMMDD dates with no trading
+    """
+
+    def __init__(self, session, timezone, holidays=""):
+        from zoneinfo import ZoneInfo
+
+        self.session = session
+        self.timezone = ZoneInfo(timezone)
+        self.holidays = frozenset(
+            datetime.datetime.strptime(day, "%Y%m%d").date() for day in re.split(r"[,;]", holidays or "") if day
+        )
+        self.always_open = session.strip().lower() == "24x7"
+
+        # weekday (0 Monday) -> [(open time, close time, days the session lasts into)]
+        self._ranges = {weekday: [] for weekday in range(7)}
+        if not self.always_open:
+            for part in re.split(r"[,|]", session):
+                match = _RANGE_RE.match(part.strip())
+                if match is None:
+                    raise ValueError(f"not a valid session: {session!r}")
+                start, end, days = match.groups()
+                start = datetime.time(int(start[:2]), int(start[2:]))
+                end = datetime.time(int(end[:2]), int(end[2:])) if end != "2400" else datetime.time.max
+                for day in days or _WEEKDAYS:
+                    if start == end:  # whole day
+                        self._ranges[(int(day) + 5) % 7].append((start, end, 1))
+                    else:
+                        self._ranges[(int(day) + 5) % 7].append((start, end, 0 if start < end else -1))
+
+    def __repr__(self):
+        return f'TradingSession("{self.session}","{self.timezone.key}")'
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def get(cls, session, timezone, holidays=""):
+        # shared instance for equal arguments
+        return cls(session, timezone, holidays)
+
+    def _windows(self, day):
+        # (open, close) aware datetimes of sessions closing on day
+        if day in self.holidays:
+            return []
+
+        windows = []
+        for start, end, days in self._ranges[day.weekday()]:
+            # overnight sessions open the day before, whole day ones close the day after
+            opened = datetime.datetime.combine(day + datetime.timedelta(days=min(days, 0)), start, tzinfo=self.timezone)
+            closed = datetime.datetime.combine(day + datetime.timedelta(days=max(days, 0)), end, tzinfo=self.timezone)
+            windows.append((opened, closed))
+
+        return sorted(windows)
+
+    def next_open(self, moment):
+        '''
+        First moment at or after moment when the market trades
+
+        Parameters
+        ----------
+        moment : datetime
+            aware datetime, naive is taken as local time
+
+        Returns
+        -------
+        datetime
+            moment itself if trading, otherwise the next session open in
+            the exchange timezone. None if no session opens within 30
+            days.
+        '''
+        moment = moment.astimezone(self.timezone)
+        if self.always_open:
+            return moment
+
+        day = moment.date()
+        for offset in range(-1, _HORIZON_DAYS + 1):  # whole day sessions close the day after
+            for opened, closed in self._windows(day + datetime.timedelta(days=offset)):
+                if closed > moment:
+                    return max(opened, moment)
+
+        return None
+
+    def is_open(self, moment):
+        '''
+        True if the market trades at moment
+
+        Parameters
+        ----------
+        moment : datetime
+            aware datetime, naive is taken as local time
+        '''
+        return self.next_open(moment) == moment.astimezone(self.timezone)
+
+    def opens(self, start, end):
+        '''
+        Session opens from start to end
+
+        Parameters
+        ----------
+        start : datetime
+            aware datetime, naive is taken as local time
+        end : datetime
+            aware datetime, naive is taken as local time
+
+        Returns
+        -------
+        list
+            aware datetimes in the exchange timezone, oldest first.
+            Every midnight for markets trading all the time.
+        '''
+        start, end = start.astimezone(self.timezone), end.astimezone(self.timezone)
+        opens = set()
+        for offset in range((end.date() - start.date()).days + 2):  # overnight sessions close the day after
+            day = start.date() + datetime.timedelta(days=offset)
+            if self.always_open:
+                windows = [(datetime.datetime.combine(day, datetime.time(), tzinfo=self.timezone), None)]
+            else:
+                windows = self._windows(day)
+            opens.update(opened for opened, _ in windows if start <= opened <= end)
+
+        return sorted(opens)
+
+    @property
+    def weekmask(self):
+        # trading days as numpy busday weekmask, Monday first
+        if self.always_open:
+            return "1111111"
+        return "".join("1" if self._ranges[weekday] else "0" for weekday in range(7))
+
+    def trades_between(self, start, end):
+        '''
+        True if the market trades at any time in [start, end)
+
+        Parameters
+        ----------
+        start : datetime
+            aware datetime, naive is taken as local time
+        end : datetime
+            aware datetime, naive is taken as local time
+        '''
+        opened = self.next_open(start)
+        return opened is not None and opened < end.astimezone(self.timezone)
+
+
+def from_symbol_info(info):
+    '''
+    TradingSession from TradingView symbol metadata
+
+    Parameters
+    ----------
+    info : dict
+        symbol_resolved payload with session and timezone fields
+
+    Returns
+    -------
+    TradingSession
+        None if the metadata has no usable session
+    '''
+    session, timezone = info.get("session"), info.get("timezone")
+    if not session or not timezone:
+        return None
+    try:
+        return TradingSession.get(session, timezone, info.get("session_holidays", ""))
+    except (ValueError, KeyError):  # unknown format or timezone
+        return None
+
+
+def from_calendar(exchange):
+    '''
+    TradingSession of exchange from the local CALENDARS table
+
+    Parameters
+    ----------
+    exchange : str
+        exchange name, e.g. "NYSE"
+
+    Returns
+    -------
+    TradingSession
+        None if the exchange is not listed or its timezone is unknown
+    '''
+    entry = CALENDARS.get(exchange)
+    if entry is None:
+        return None
+    try:
+        return TradingSession.get(*entry)
+    except (ValueError, KeyError):  # timezone database missing, e.g. Windows without tzdata
+        return None
@@ -0,0 +1,572 @@
+import collections
+import json
+import logging
+import random
+import re
+import string
+import threading
+import time
+from .interval import bucket_start
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+_FRAME_RE = re.compile(r"~m~\d+~m~")
+
+
+def encode(func, params):
+    # build protocol frame for message func with params
+    text = json.dumps({"m": func, "p": params}, separators=(",", ":"))
+    return "~m~" + str(len(text)) + "~m~" + text
+
+
+def decode(message):
+    # split websocket message into frame payloads
+    return [payload for payload in _FRAME_RE.split(message) if payload]
+
+
+def session_id(prefix):
+    # random session name such as cs_xxxxxxxxxxxx
+    return prefix + "_" + "".join(random.choice(string.ascii_lowercase) for _ in range(12))
+
+
+class StreamSession(object):
+    """
+    Base of persistent TradingView websocket sessions
+
+    Keeps one connection open in a background thread, answers server
+    heartbeats and reconnects with exponential backoff when the
+    connection is lost. Subclasses send their subscriptions in
+    _subscribe(), which is called under _lock after every (re)connect,
+    and process decoded server messages in _handle().
+
+    Parameters
+    ----------
+    tvdatafeed : TvDatafeed
+        instance providing connections and auth token
+    name : str
+        name of the background thread
+    """
+
+    _recv_timeout = 30  # no message (not even heartbeat) for this long means dead connection
+    _max_backoff = 30
+
+    def __init__(self, tvdatafeed, name):
+        self._tvdatafeed = tvdatafeed
+        self._name = name
+        self._ws = None
+        self._lock = threading.RLock()  # subscription state and connection swap
+        self._send_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        '''
+        Start the background connection, does nothing if running
+        '''
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._running = True
+            self._thread = threading.Thread(name=self._name, target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        '''
+        Close the connection and stop the background thread
+
+        Parameters
+        ----------
+        timeout : float, optional
+            maximum time to wait for the thread in seconds, default
+            is None (blocking)
+        '''
+        with self._lock:
+            self._running = False
+            thread, self._thread = self._thread, None
+            self._close_ws()
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _close_ws(self):
+        ws, self._ws = self._ws, None
+        if ws is None:
+            return
+        try:
+            ws.abort()  # wakes up the reader blocked in recv
+        except Exception:
+            pass
+        try:
+            ws.close(timeout=1)
+        except Exception:
+            pass
+
+    def _send(self, func, params):
+        # send message if connected, subscriptions which fail here are
+        # sent again by _subscribe() after reconnecting
+        ws = self._ws
+        if ws is None:
+            return False
+        try:
+            with self._send_lock:
+                ws.send(encode(func, params))
+        except Exception as e:
+            logger.debug(f"{self._name} send failed: {e}")
+            return False
+
+        return True
+
+    def _subscribe(self):
+        raise NotImplementedError
+
+    def _handle(self, message):
+        raise NotImplementedError
+
+    def _run(self):
+        # background thread: connect, subscribe and dispatch messages
+        # until stopped, reconnect on errors
+        backoff = 1
+        while self._running:
+            try:
+                ws = self._tvdatafeed._open_connection()
+                ws.settimeout(self._recv_timeout)
+                with self._lock:
+                    if not self._running:
+                        ws.close()
+                        break
+                    self._ws = ws
+                    self._send("set_auth_token", [self._tvdatafeed.token])
+                    self._subscribe()
+
+                while self._running:
+                    for payload in decode(ws.recv()):
+                        if payload.startswith("~h~"):  # heartbeat, echo it back
+                            with self._send_lock:
+                                ws.send("~m~" + str(len(payload)) + "~m~" + payload)
+                        else:
+                            try:
+                                message = json.loads(payload)
+                            except ValueError:
+                                continue
+                            self._handle(message)
+                backoff = 1
+            except Exception as e:
+                if not self._running:
+                    break
+                logger.warning(f"{self._name} connection lost ({e}), reconnecting in {backoff}s")
+                with self._lock:
+                    self._close_ws()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+
+
+class _Series(object):
+    # subscription state of one Seis in a chart session
+    __slots__ = ("seis", "series_id", "symbol_id", "resolution", "custom", "open_bar", "primed", "parts")
+
+    def __init__(self, seis, number):
+        self.seis = seis
+        self.series_id = f"sds_{number}"
+        self.symbol_id = f"sds_sym_{number}"
+        # custom intervals are built from their native base interval
+        self.custom = None if seis.interval.native else seis.interval
+        self.resolution = seis.interval.value if self.custom is None else self.custom.base.value
+        self.open_bar = None  # [timestamp, open, high, low, close, volume] of the bar still open
+        self.primed = False  # initial history received, bars opening after this are new
+        self.parts = []  # closed base bars of the open custom interval bar
+
+
+class ChartStream(StreamSession):
+    """
+    One persistent chart session streaming bars of many Seises
+
+    Every Seis gets its own series in the chart session. The server
+    pushes timescale_update and du messages whenever a bar changes, a
+    bar is final as soon as the next bar opens, and that is when it is
+    passed to on_bar. Custom intervals are subscribed at their native
+    base interval and aggregated here.
+
+    Parameters
+    ----------
+    tvdatafeed : TvDatafeed
+        instance providing connections and auth token
+    on_bar : func
+        called from the stream thread with (seis, bar) for every closed
+        bar, where bar is [timestamp, open, high, low, close, volume]
+    """
+
+    def __init__(self, tvdatafeed, on_bar):
+        super().__init__(tvdatafeed, "chart_stream")
+        self._on_bar = on_bar
+        self._chart_session = session_id("cs")
+        self._series = {}  # series id -> _Series
+        self._keys = {}  # (symbol, exchange, interval value) -> series id
+        self._counter = 0
+
+    @staticmethod
+    def _key(seis):
+        return (seis.symbol, seis.exchange, seis.interval.value)
+
+    def add(self, seis):
+        '''
+        Start streaming bars of Seis
+
+        Parameters
+        ----------
+        seis : Seis
+            Seis to subscribe
+        '''
+        with self._lock:
+            if self._key(seis) in self._keys:
+                return
+            self._counter += 1
+            series = _Series(seis, self._counter)
+            self._series[series.series_id] = series
+            self._keys[self._key(seis)] = series.series_id
+            if self._ws is not None:
+                self._create_series(series)
+
+    def discard(self, seis):
+        '''
+        Stop streaming bars of Seis
+
+        Parameters
+        ----------
+        seis : Seis
+            Seis to unsubscribe
+        '''
+        with self._lock:
+            series_id = self._keys.pop(self._key(seis), None)
+            if series_id is None:
+                return
+            del self._series[series_id]
+            self._send("remove_series", [self._chart_session, series_id])
+
+    def __len__(self):
+        return len(self._series)
+
+    def _create_series(self, series):
+        self._send("resolve_symbol", [
+            self._chart_session,
+            series.symbol_id,
+            '={"symbol":"' + series.seis.exchange + ":" + series.seis.symbol
+            + '","adjustment":"splits","session":"regular"}',
+        ])
+        # a custom interval needs the closed base bars of its open bar
+        n_bars = 2 if series.custom is None else series.custom.ratio + 1
+        self._tvdatafeed.rate_limiter.acquire("series")
+        self._send("create_series", [
+            self._chart_session, series.series_id, "s1", series.symbol_id, series.resolution, n_bars, ""])
+
+    def _subscribe(self):
+        self._send("chart_create_session", [self._chart_session, ""])
+        self._send("switch_timezone", [self._chart_session, "exchange"])
+        for series in self._series.values():
+            self._create_series(series)
+
+    def _handle(self, message):
+        kind = message.get("m")
+        params = message.get("p", ())
+        closed = []
+
+        if kind in ("du", "timescale_update"):
+            with self._lock:
+                for series_id, update in params[1].items():
+                    series = self._series.get(series_id)
+                    if series is None or not isinstance(update, dict):
+                        continue
+                    for item in update.get("s", ()):
+                        self._update(series, item["v"], closed)
+        elif kind == "series_completed":
+            with self._lock:
+                series = self._series.get(params[1])
+                if series is not None:
+                    series.primed = True
+        elif kind in ("symbol_error", "series_error", "critical_error", "protocol_error"):
+            logger.error(f"chart stream {kind}: {params}")
+
+        for seis, bar in closed:
+            try:
+                self._on_bar(seis, bar)
+            except Exception as e:
+                logger.error(f"chart stream bar handler failed: {e}")
+
+    def _update(self, series, values, closed):
+        # apply bar update, collect (seis, bar) of bars it closed
+        values = list(values[:6]) + [0.0] * (6 - len(values))  # volume missing for some symbols
+        open_bar = series.open_bar
+
+        if open_bar is None or values[0] == open_bar[0]:
+            series.open_bar = values
+            return
+        if values[0] < open_bar[0]:  # history replayed after reconnect
+            return
+
+        series.open_bar = values
+        if series.custom is None:
+            if series.primed:  # bars of the initial history are not new
+                closed.append((series.seis, open_bar))
+            return
+
+        series.parts.append(open_bar)
+        if not series.primed:  # initial history seeds the open custom interval bar
+            del series.parts[:-series.custom.ratio]
+            return
+
+        session = self._tvdatafeed.get_session(series.seis.symbol, series.seis.exchange)
+        start = bucket_start(series.custom, open_bar[0], session)
+        if bucket_start(series.custom, values[0], session) != start:  # custom interval bar is complete
+            parts, series.parts = series.parts, []
+            parts = [part for part in parts if bucket_start(series.custom, part[0], session) == start]
+            if parts:
+                closed.append((series.seis, [
+                    start,
+                    parts[0][1],
+                    max(part[2] for part in parts),
+                    min(part[3] for part in parts),
+                    parts[-1][4],
+                    sum(part[5] for part in parts),
+                ]))
+
+
+class _QuoteListener(object):
+    # delivers quote updates to one callback from its own thread so a
+    # slow callback never stalls the socket reader. With coalesce the
+    # changes of a symbol that arrive while the callback is busy are
+    # merged and delivered as one update with the newest values. Inline
+    # listeners have no thread, callback runs in the socket reader.
+    def __init__(self, callback, symbols, coalesce, inline=False):
+        self.callback = callback
+        self.symbols = frozenset(symbols)
+        self.coalesce = coalesce
+
+        self._cond = threading.Condition()
+        self._pending = {} if coalesce else collections.deque()
+        self._closed = False
+        if inline:
+            self.put = self._call
+            return
+        self._thread = threading.Thread(name="quotes_" + getattr(callback, "__name__", "callback"),
+                                        target=self._run, daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f"QuoteSubscription({sorted(self.symbols)},{getattr(self.callback, '__name__', self.callback)})"
+
+    def put(self, symbol, changes):
+        with self._cond:
+            if self.coalesce:
+                pending = self._pending.get(symbol)
+                if pending is None:
+                    self._pending[symbol] = dict(changes)
+                else:
+                    pending.update(changes)
+            else:
+                self._pending.append((symbol, changes))
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    break
+                items = list(self._pending.items()) if self.coalesce else list(self._pending)
+                self._pending.clear()
+
+            for symbol, changes in items:
+                self._call(symbol, changes)
+
+    def _call(self, symbol, changes):
+        try:
+            with tracing.span("tvdatafeed.quote.callback", symbol=symbol):
+                self.callback(symbol, changes)
+        except Exception as e:
+            logger.error(f"quote callback {self!r} failed: {e}")
+
+
+class QuoteStream(StreamSession):
+    """
+    Real-time quote updates of many symbols over one quote session
+
+    Subscribed symbols are added to a single quote session and every qsd
+    message the server pushes is decoded into the fields which actually
+    changed. Those are passed to each callback subscribed to the symbol
+    as func_name(symbol, changes), where changes is a dict such as
+    {"lp": 43012.5, "volume": 1520.3}. The first update of a symbol
+    holds all of its known fields.
+
+    Each callback runs in its own thread. With coalesce=True updates of
+    a symbol which arrive while the callback is still busy are merged
+    so a slow callback always sees the newest values instead of falling
+    behind.
+
+    Parameters
+    ----------
+    tvdatafeed : TvDatafeed
+        instance providing connections and auth token
+    fields : list, optional
+        quote fields to stream, defaults to QuoteStream.FIELDS
+
+    Methods
+    -------
+    subscribe(symbols, callback, coalesce)
+        Deliver quote updates of symbols to callback
+    unsubscribe(subscription)
+        Stop delivering to a subscription
+    quote(symbol)
+        Latest known values of symbol
+    stop()
+        Close the quote session
+    """
+
+    FIELDS = ("lp", "lp_time", "ch", "chp", "volume", "bid", "ask", "bid_size", "ask_size")
+
+    def __init__(self, tvdatafeed, fields=None):
+        super().__init__(tvdatafeed, "quote_stream")
+        self.fields = tuple(fields) if fields is not None else self.FIELDS
+        self._quote_session = session_id("qs")
+        self._quotes = {}  # symbol -> latest values
+        self._listeners = ()  # replaced, never mutated, so the reader can use it without the lock
+
+    @staticmethod
+    def _format_symbol(symbol):
+        if isinstance(symbol, tuple):  # (symbol, exchange)
+            return f"{symbol[1]}:{symbol[0]}"
+        return symbol
+
+    def subscribe(self, symbols, callback, coalesce=False, inline=False):
+        '''
+        Deliver quote updates of symbols to callback
+
+        Starts the quote session if it is not running yet.
+
+        Parameters
+        ----------
+        symbols : list
+            symbols in EXCHANGE:SYMBOL format or (symbol, exchange)
+            tuples
+        callback : func
+            function with prototype func_name(symbol, changes)
+        coalesce : bool, optional
+            merge updates of a symbol while callback is busy (default
+            False)
+        inline : bool, optional
+            call callback directly from the socket thread instead of a
+            thread of its own, only for callbacks which return almost
+            immediately (default False)
+
+        Returns
+        -------
+        subscription
+            handle to pass to unsubscribe()
+        '''
+        symbols = [self._format_symbol(symbol) for symbol in symbols]
+        listener = _QuoteListener(callback, symbols, coalesce, inline)
+
+        with self._lock:
+            added = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self._quotes]
+            for symbol in added:
+                self._quotes[symbol] = {}
+            self._listeners = self._listeners + (listener,)
+            if added and self._ws is not None:
+                self._add_symbols(added)
+
+        self.start()
+
+        return listener
+
+    def unsubscribe(self, subscription):
+        '''
+        Stop delivering to a subscription
+
+        Symbols no other subscription needs are removed from the quote
+        session.
+
+        Parameters
+        ----------
+        subscription
+            handle returned by subscribe()
+        '''
+        with self._lock:
+            if subscription not in self._listeners:
+                return
+            self._listeners = tuple(listener for listener in self._listeners if listener is not subscription)
+            needed = set().union(*(listener.symbols for listener in self._listeners))
+            removed = [symbol for symbol in subscription.symbols if symbol not in needed]
+            for symbol in removed:
+                del self._quotes[symbol]
+            if removed:
+                self._send("quote_remove_symbols", [self._quote_session] + removed)
+                self._send("quote_fast_symbols", [self._quote_session] + list(self._quotes))
+
+        subscription.close()
+
+    def quote(self, symbol):
+        '''
+        Latest known values of symbol
+
+        Parameters
+        ----------
+        symbol : str
+            symbol in EXCHANGE:SYMBOL format
+
+        Returns
+        -------
+        dict
+            field values, None if symbol is not subscribed
+        '''
+        with self._lock:
+            values = self._quotes.get(self._format_symbol(symbol))
+            return dict(values) if values is not None else None
+
+    def stop(self, timeout=None):
+        super().stop(timeout)
+
+        with self._lock:
+            listeners, self._listeners = self._listeners, ()
+        for listener in listeners:
+            listener.close()
+
+    def _add_symbols(self, symbols):
+        self._send("quote_add_symbols", [self._quote_session] + symbols)
+        self._send("quote_fast_symbols", [self._quote_session] + list(self._quotes))
+
+    def _subscribe(self):
+        self._send("quote_create_session", [self._quote_session])
+        self._send("quote_set_fields", [self._quote_session] + list(self.fields))
+        if self._quotes:
+            self._add_symbols(list(self._quotes))
+
+    def _handle(self, message):
+        kind = message.get("m")
+        if kind != "qsd":
+            if kind in ("critical_error", "protocol_error"):
+                logger.error(f"quote stream {kind}: {message.get('p')}")
+            return
+
+        update = message["p"][1]
+        symbol = update.get("n")
+        if update.get("s") != "ok":
+            logger.warning(f"quote stream error for {symbol}: {update.get('v', update)}")
+            return
+
+        with self._lock:
+            last = self._quotes.get(symbol)
+            if last is None:  # unsubscribed meanwhile
+                return
+            changes = {key: value for key, value in update.get("v", {}).items() if last.get(key) != value}
+            last.update(changes)
+            listeners = self._listeners
+
+        if changes:
+            for listener in listeners:
+                if symbol in listener.symbols:
+                    listener.put(symbol, changes)
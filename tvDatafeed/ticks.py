@@ -0,0 +1,302 @@
+import logging
+import re
+import threading
+import time
+from .interval import Interval, bucket_start, _seconds, _split
+
+logger = logging.getLogger(__name__)
+
+_RULE_RE = re.compile(r"^(\d+(?:\.\d+)?)([TV])$")
+
+
+class BarRule(object):
+    """
+    How quote ticks are grouped into bars
+
+    Rules are written as strings: an intraday time interval such as
+    "5S", "10S" or "1" closes bars on the clock, "100T" closes a bar
+    every 100 ticks and "5000V" once a bar has traded 5000 units. Like
+    Interval members rules have value and name attributes so they can
+    be used as the interval of a Seis.
+
+    Parameters
+    ----------
+    value : str
+        rule string, e.g. "5S", "100T" or "5000V"
+    """
+
+    def __init__(self, value):
+        value = str(value).strip().upper()
+        match = _RULE_RE.match(value)
+        if match is not None:
+            size, unit = match.groups()
+            if unit == "T" and "." in size:  # whole ticks only
+                raise ValueError(f"not a valid bar rule: {value!r}")
+            self._kind = "ticks" if unit == "T" else "volume"
+            self._size = int(size) if self._kind == "ticks" else float(size)
+            if self._size <= 0:
+                raise ValueError(f"not a valid bar rule: {value!r}")
+            self._interval = None
+            self._value = value
+        else:
+            self._kind = "time"
+            self._interval = Interval.custom(value)
+            if _split(self._interval.value)[1] in ("D", "W", "M"):  # they follow sessions, not the clock
+                raise ValueError("daily, weekly and monthly bars can not be built from ticks")
+            self._size = _seconds(self._interval.value)
+            self._value = self._interval.value
+
+    def __eq__(self, other):
+        if isinstance(other, BarRule):
+            return self._value == other._value
+
+        return False
+
+    def __hash__(self):
+        return hash(("ticks", self._value))
+
+    def __repr__(self):
+        return f'BarRule("{self._value}")'
+
+    @property  # read-only attribute
+    def value(self):
+        return self._value
+
+    @property  # read-only attribute
+    def name(self):
+        if self._kind == "time":
+            return self._interval.name + "_ticks"
+        return f"in_{self._value[:-1]}_{self._kind}"
+
+    @property  # read-only attribute
+    def kind(self):
+        # "time", "ticks" or "volume"
+        return self._kind
+
+    @property  # read-only attribute
+    def interval(self):
+        # time bars: the bar Interval, None otherwise
+        return self._interval
+
+    @property  # read-only attribute
+    def size(self):
+        # bar length in seconds, ticks or volume
+        return self._size
+
+    @property
+    def native(self):
+        return False
+
+
+class _Builder(object):
+    # bar under construction for one Seis
+    __slots__ = ("seis", "rule", "session", "bar", "end", "ticks")
+
+    def __init__(self, seis, session=None):
+        self.seis = seis
+        self.rule = seis.interval
+        self.session = session  # time bars are aligned to its opens
+        self.bar = None  # [timestamp, open, high, low, close, volume]
+        self.end = None  # time bars: epoch timestamp when the bar closes
+        self.ticks = 0
+
+    def update(self, ts, price, volume):
+        # add tick, return bar it completed or None
+        closed = None
+        bar = self.bar
+        if bar is not None and self.end is not None and ts >= self.end:
+            closed, bar = bar, None
+
+        if bar is None:
+            if self.rule.kind == "time":
+                start = bucket_start(self.rule.interval, ts, self.session)
+                self.end = start + self.rule.size
+            else:
+                start = ts
+            bar = self.bar = [start, price, price, price, price, 0.0]
+            self.ticks = 0
+        else:
+            if price > bar[2]:
+                bar[2] = price
+            elif price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+
+        bar[5] += volume
+        self.ticks += 1
+
+        kind = self.rule.kind
+        if (kind == "ticks" and self.ticks >= self.rule.size) or (kind == "volume" and bar[5] >= self.rule.size):
+            closed, self.bar = bar, None
+
+        return closed
+
+    def flush(self, now):
+        # close time bar if its period is over, return it or None
+        if self.bar is not None and self.end is not None and now >= self.end:
+            closed, self.bar = self.bar, None
+            return closed
+
+        return None
+
+
+class _Symbol(object):
+    # last seen values and bar builders of one symbol
+    __slots__ = ("price", "volume", "builders", "subscription")
+
+    def __init__(self):
+        self.price = None
+        self.volume = None  # cumulative session volume from the quote
+        self.builders = []
+        self.subscription = None
+
+
+class TickAggregator(object):
+    """
+    Build bars locally from real-time quote updates
+
+    Every quote update with a new last price or volume is one tick.
+    Ticks are timed by their arrival and added to the open bar of every
+    Seis of the symbol in constant time. Tick and volume bars close on
+    the tick which reaches their size, the tick is not split. Time bars
+    close on the first tick after their period, and a timer closes them
+    when the symbol has gone quiet.
+
+    Parameters
+    ----------
+    tvdatafeed : TvDatafeed
+        instance providing the quote stream
+    on_bar : func
+        called with (seis, bar) for every completed bar where bar is
+        [timestamp, open, high, low, close, volume]
+    flush_interval : float, optional
+        how often quiet time bars are checked for closing in seconds
+        (default 0.5)
+    """
+
+    FIELDS = ("lp", "volume")
+
+    def __init__(self, tvdatafeed, on_bar, flush_interval=0.5):
+        self._tvdatafeed = tvdatafeed
+        self._on_bar = on_bar
+        self._flush_interval = flush_interval
+        self._quotes = tvdatafeed.stream_quotes(self.FIELDS)
+
+        self._lock = threading.Lock()
+        self._symbols = {}  # EXCHANGE:SYMBOL -> _Symbol
+        self._stopped = threading.Event()
+        self._timer = None
+
+    def __contains__(self, seis):
+        with self._lock:
+            state = self._symbols.get(seis.exchange + ":" + seis.symbol)
+            return state is not None and any(builder.seis == seis for builder in state.builders)
+
+    def __iter__(self):
+        with self._lock:
+            return iter([builder.seis for state in self._symbols.values() for builder in state.builders])
+
+    def add(self, seis):
+        '''
+        Start building bars for Seis, its interval must be a BarRule
+
+        Parameters
+        ----------
+        seis : Seis
+            Seis to build bars for
+        '''
+        symbol = seis.exchange + ":" + seis.symbol
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None:
+                state = self._symbols[symbol] = _Symbol()
+            elif any(builder.seis == seis for builder in state.builders):
+                return
+            session = self._tvdatafeed.get_session(seis.symbol, seis.exchange) if seis.interval.kind == "time" else None
+            state.builders.append(_Builder(seis, session))
+            if state.subscription is None:
+                state.subscription = self._quotes.subscribe([symbol], self._on_quote, inline=True)
+
+            if self._timer is None:
+                self._timer = threading.Thread(name="tick_aggregator", target=self._run_timer, daemon=True)
+                self._timer.start()
+
+    def discard(self, seis):
+        '''
+        Stop building bars for Seis, the open bar is dropped
+
+        Parameters
+        ----------
+        seis : Seis
+            Seis to remove
+        '''
+        symbol = seis.exchange + ":" + seis.symbol
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None:
+                return
+            state.builders = [builder for builder in state.builders if builder.seis != seis]
+            if state.builders:
+                return
+            del self._symbols[symbol]
+
+        if state.subscription is not None:
+            self._quotes.unsubscribe(state.subscription)
+
+    def stop(self):
+        '''
+        Close the quote stream and stop the flush timer
+        '''
+        self._stopped.set()
+        self._quotes.stop()
+
+    def _on_quote(self, symbol, changes):
+        # called from the quote stream thread for every update
+        now = time.time()
+        closed = []
+        with self._lock:
+            state = self._symbols.get(symbol)
+            if state is None:
+                return
+
+            volume = 0.0
+            if "volume" in changes:
+                total = changes["volume"]
+                if state.volume is not None and total >= state.volume:
+                    volume = total - state.volume
+                state.volume = total
+            elif "lp" not in changes:
+                return
+
+            first = state.price is None  # initial snapshot, not a trade
+            state.price = changes.get("lp", state.price)
+            if first or state.price is None:
+                return
+
+            for builder in state.builders:
+                bar = builder.update(now, state.price, volume)
+                if bar is not None:
+                    closed.append((builder.seis, bar))
+
+        self._emit(closed)
+
+    def _run_timer(self):
+        # close time bars of symbols which stopped ticking
+        while not self._stopped.wait(self._flush_interval):
+            now = time.time()
+            closed = []
+            with self._lock:
+                for state in self._symbols.values():
+                    for builder in state.builders:
+                        bar = builder.flush(now)
+                        if bar is not None:
+                            closed.append((builder.seis, bar))
+
+            self._emit(closed)
+
+    def _emit(self, closed):
+        for seis, bar in closed:
+            try:
+                self._on_bar(seis, bar)
+            except Exception as e:
+                logger.error(f"tick bar handler failed: {e}")
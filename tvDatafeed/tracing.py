@@ -0,0 +1,51 @@
+import contextlib
+
+# tracer all spans are created with, None disables tracing
+_tracer = None
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def set_tracer(tracer):
+    """Enable tracing with given tracer, None disables tracing
+
+    Any OpenTelemetry compatible tracer can be used, i.e. an object with
+    a start_as_current_span(name, attributes=...) method returning a
+    context manager, such as opentelemetry.trace.get_tracer("tvDatafeed").
+
+    Args:
+        tracer (opentelemetry.trace.Tracer): tracer to create spans with
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer():
+    """Return tracer set with set_tracer or None if tracing is disabled"""
+    return _tracer
+
+
+def span(name, **attributes):
+    """Context manager for a span which is current while the block runs
+
+    Returns a shared no-op context manager when no tracer is set.
+    Attribute names are prefixed with "tv.".
+
+    Args:
+        name (str): span name
+
+    Returns:
+        contextmanager: span context
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NO_SPAN
+
+    return tracer.start_as_current_span(
+        name, attributes={"tv." + key: value for key, value in attributes.items() if value is not None}
+    )
+
+
+def seis_attributes(seis):
+    # span attributes identifying a Seis
+    return {"symbol": seis.symbol, "exchange": seis.exchange, "interval": seis.interval.value}